@@ -0,0 +1,118 @@
+import os
+import math
+import asyncio
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Hashable, Optional
+
+import metrics
+
+MAX_CONCURRENCY = int(os.environ.get("MAX_CONCURRENCY", os.cpu_count() or 2))
+MAX_QUEUE = int(os.environ.get("MAX_QUEUE", 16))
+QUEUE_TIMEOUT = float(os.environ.get("QUEUE_TIMEOUT", 2.0))
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", 1024))
+
+REJECTED_REQUESTS = metrics.counter(
+    "qa_rejected_requests_total", "Requests shed by admission control"
+)
+DEGRADED_REQUESTS = metrics.counter(
+    "qa_degraded_requests_total", "Overload requests answered in degraded mode"
+)
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted within the queue limits"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bound the answer path to N concurrent computations and M queued requests"""
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_queue: int = MAX_QUEUE,
+                 queue_timeout: float = QUEUE_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        # Created on first use so it binds to the server's event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.queue_timeout))
+
+    async def acquire(self):
+        """Take a concurrency slot, queueing briefly; raise Overloaded if that fails"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            REJECTED_REQUESTS.inc(reason="queue_full")
+            raise Overloaded("Too many queued requests", self.retry_after)
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            REJECTED_REQUESTS.inc(reason="queue_timeout")
+            raise Overloaded("Timed out waiting for a worker", self.retry_after)
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self):
+        """Return a slot taken with acquire()"""
+        self.active -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the concurrency slots for the duration of the block"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue
+        }
+
+
+class AnswerCache:
+    """LRU of recent retrieval results, served as a fallback under overload"""
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[list]:
+        with self._lock:
+            results = self._entries.get(key)
+            if results is not None:
+                self._entries.move_to_end(key)
+            return results
+
+    def put(self, key: Hashable, results: list):
+        with self._lock:
+            self._entries[key] = results
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
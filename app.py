@@ -1,21 +1,38 @@
 import os
-from fastapi import FastAPI, HTTPException
+import time
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List
+from datetime import date
 import uvicorn
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 import json
+import orjson
 import logging
+import asyncio
+import threading
+import weakref
+from datetime import datetime
 import base64
+from PIL import UnidentifiedImageError
+import metrics
+import image_utils
+import ocr
+import profiling
+from compression import CompressionMiddleware
+from singleflight import SingleFlight, normalize_question
+from admission import AdmissionController, AnswerCache, Overloaded, DEGRADED_REQUESTS
+from starlette.concurrency import run_in_threadpool
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app
-app = FastAPI()
+# Initialize FastAPI app; orjson serializes responses without a jsonable_encoder pass
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Configure CORS
 app.add_middleware(
@@ -24,12 +41,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Compress larger JSON bodies with br/gzip depending on Accept-Encoding
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+)
+
+# Outermost, so latency covers compression too
+app.add_middleware(metrics.TimingMiddleware)
+
 # Data models
 class QuestionRequest(BaseModel):
     question: str
     image: Optional[str] = Field(None, description="Base64 encoded image file")
+    source: Optional[str] = Field(None, description="Only answer from this source, e.g. course or forum")
+    start_date: Optional[date] = Field(None, description="Only answer from content dated on or after this day")
+    end_date: Optional[date] = Field(None, description="Only answer from content dated on or before this day")
 
 class Link(BaseModel):
     url: str
@@ -38,16 +68,127 @@ class Link(BaseModel):
 class Answer(BaseModel):
     answer: str
     links: List[Link]
+    context: Optional[str] = None
 
-# Global variables for data storage
+# Global variables for data storage. qa_system is the live index; it is
+# replaced in a single assignment on reload, and request handlers read it
+# once so in-flight requests finish against the index they started with.
 embeddings = None
 chunks = None
 chunk_metadata = None
+qa_system = None
+index_version = 0
+index_loaded_at = None
+index_reloading = False
+last_reload_error = None
+_reload_lock = threading.Lock()
+_watch_task = None
+
+# Identical concurrent questions share one retrieval
+answer_flight = SingleFlight()
+
+# Bounded work queue in front of retrieval, and what to serve when it is full
+admission = AdmissionController()
+answer_cache = AnswerCache()
+DEGRADED_MODES = [
+    mode.strip()
+    for mode in os.environ.get("DEGRADED_MODES", "cache,lexical").split(",")
+    if mode.strip()
+]
+
+def build_index(data_file: str, previous=None):
+    """Build a QASystem for a data file, reusing the models of a previous index"""
+    from project1 import QASystem
+    index_dir = os.environ.get("QA_INDEX_DIR")
+    shards = int(os.environ.get("QA_SEARCH_SHARDS", 0))
+    if previous is not None:
+        return QASystem(data_file, reranker=previous.reranker, encoder=previous.model,
+                        index_dir=index_dir, shards=shards)
+
+    reranker = None
+    if os.environ.get("RERANKER_MODEL"):
+        from reranker import CrossEncoderReranker
+        reranker = CrossEncoderReranker(
+            os.environ["RERANKER_MODEL"],
+            shortlist=int(os.environ.get("RERANK_SHORTLIST", 50)),
+            budget_ms=float(os.environ.get("RERANK_BUDGET_MS", 150))
+        )
+    return QASystem(data_file, reranker=reranker, index_dir=index_dir, shards=shards)
+
+def swap_index(new_index):
+    """Make a freshly built index live and let the old one be freed"""
+    global embeddings, chunks, chunk_metadata, qa_system, index_version, index_loaded_at
+    old_index = qa_system
+    qa_system = new_index
+    embeddings = new_index.embeddings
+    chunks = new_index.chunks
+    chunk_metadata = new_index.chunk_metadata
+    index_version += 1
+    index_loaded_at = datetime.now().isoformat()
+    # Cached answers point at chunks of the old index
+    answer_cache.clear()
+    logger.info(f"Index version {index_version} is live ({len(chunks)} chunks)")
+
+    if old_index is not None:
+        # Memory goes once the last in-flight request drops its reference
+        weakref.finalize(old_index, logger.info, f"Released index version {index_version - 1}")
+
+def reload_index(data_file: Optional[str] = None) -> bool:
+    """
+    Build a new index in the calling thread and swap it in
+    Args:
+        data_file (str): Crawled JSONL file; defaults to QA_DATA_FILE
+    Returns:
+        bool: True if the new index is live; False if another reload was
+            already running or the build failed (see last_reload_error)
+    """
+    global index_reloading, last_reload_error
+    if not _reload_lock.acquire(blocking=False):
+        return False
+    index_reloading = True
+    try:
+        data_file = data_file or os.environ.get("QA_DATA_FILE")
+        start = time.perf_counter()
+        new_index = build_index(data_file, previous=qa_system)
+        logger.info(f"Built new index from {data_file} in {time.perf_counter() - start:.1f}s")
+        swap_index(new_index)
+        last_reload_error = None
+        return True
+    except Exception as e:
+        logger.error(f"Index reload failed, keeping version {index_version}: {str(e)}")
+        last_reload_error = {"error": str(e), "at": datetime.now().isoformat()}
+        return False
+    finally:
+        index_reloading = False
+        _reload_lock.release()
+
+async def watch_index_file(data_file: str, interval: float):
+    """Reload the index whenever the data file's modification time changes"""
+    last_mtime = os.path.getmtime(data_file)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            mtime = os.path.getmtime(data_file)
+        except OSError:
+            continue
+        if mtime != last_mtime:
+            logger.info(f"{data_file} changed, reloading index")
+            # Only a successful reload counts: if another reload held the lock
+            # or the file was half-written, try again on the next tick
+            if await run_in_threadpool(reload_index, data_file):
+                last_mtime = mtime
 
 def load_data():
     """Load pre-computed data"""
     global embeddings, chunks, chunk_metadata
     try:
+        # Serve real answers when a crawled content file is configured
+        data_file = os.environ.get("QA_DATA_FILE")
+        if data_file and os.path.exists(data_file):
+            swap_index(build_index(data_file))
+            logger.info(f"Loaded {len(chunks)} chunks from {data_file}")
+            return True
+
         # For testing/deployment, use dummy data if files don't exist
         embeddings = np.zeros((1, 384))  # Dummy embedding vector
         chunks = ["This is a test chunk"]
@@ -61,70 +202,483 @@ def load_data():
         logger.error(f"Error loading data: {str(e)}")
         return False
 
-def process_image(base64_image: str) -> str:
-    """Process the base64 encoded image and return relevant information"""
+async def process_image_file(spooled: image_utils.SpooledImage) -> str:
+    """Decode a spooled image upload and return any text found in it"""
+    try:
+        image = await run_in_threadpool(image_utils.load_image, spooled)
+    except UnidentifiedImageError:
+        # Same as an image OCR can't read: answer from the question alone
+        logger.warning(f"Attachment is not a readable image ({spooled.size} bytes), ignoring it")
+        return ""
+    logger.info(f"Received image attachment ({spooled.size} bytes, {spooled.digest[:12]})")
+    return await ocr.extract_text(image, spooled.digest)
+
+async def process_image(base64_image: str) -> str:
+    """Process the base64 encoded image and return any text found in it"""
     try:
-        # Decode base64 image (just logging for now)
-        logger.info("Received image attachment")
-        return "Image received and processed"
+        spooled = image_utils.spool_base64(base64_image)
+        try:
+            return await process_image_file(spooled)
+        finally:
+            spooled.close()
+    except image_utils.ImageTooLarge:
+        raise
     except Exception as e:
         logger.error(f"Error processing image: {str(e)}")
-        return "Error processing image"
+        return ""
+
+def parse_fields(fields: Optional[str]) -> Optional[set]:
+    """Parse a comma separated ?fields= value into a set of Answer fields"""
+    if not fields:
+        return None
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = selected - set(Answer.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    return selected
+
+def search_filters(source: Optional[str] = None, start_date: Optional[date] = None,
+                   end_date: Optional[date] = None) -> dict:
+    """Collect the metadata filters that were set into QASystem.search keyword arguments"""
+    filters = {"source": source or None, "start": start_date, "end": end_date}
+    return {key: value for key, value in filters.items() if value is not None}
+
+async def retrieve(qa, query: str, include_context: bool, filters: dict) -> list:
+    """Run retrieval in the thread pool once a concurrency slot is free"""
+    async with admission.slot():
+        return await run_in_threadpool(
+            qa.get_answer,
+            query,
+            include_context=include_context,
+            **filters
+        )
+
+async def profiled_retrieve(qa, query: str, include_context: bool, filters: dict):
+    """Like retrieve(), but under cProfile; returns (results, profile summary)"""
+    async with admission.slot():
+        return await run_in_threadpool(
+            profiling.profile_call,
+            qa.get_answer,
+            query,
+            include_context=include_context,
+            **filters
+        )
+
+async def degraded_results(qa, query: str, include_context: bool, filters: dict, cache_key):
+    """
+    Find an answer that needs no model call, for use under overload
+    The cache lookup runs inline; the lexical search runs in the threadpool
+    so it does not stall the event loop while the server is overloaded
+    Returns:
+        tuple: (results, mode) or (None, None) if degraded modes are off or found nothing
+    """
+    for mode in DEGRADED_MODES:
+        if mode == "cache":
+            results = answer_cache.get(cache_key)
+            if results is not None:
+                return results, mode
+        elif mode == "lexical":
+            results = await run_in_threadpool(
+                qa.get_answer, query, include_context=include_context, lexical=True, **filters
+            )
+            if results[0]['source_url']:
+                return results, mode
+    return None, None
+
+def answer_body(results: list) -> dict:
+    """Shape get_answer results as an Answer dict"""
+    # Plain dicts in the Answer shape; pydantic would only re-validate them
+    return {
+        "answer": results[0]['answer'],
+        "links": [
+            {"url": result['source_url'], "text": result['source_title']}
+            for result in results
+            if result['source_url']
+        ],
+        "context": results[0]['context']
+    }
+
+async def build_answer(question: str, image_text: str = "", fields: Optional[set] = None,
+                       filters: Optional[dict] = None, profile: bool = False) -> ORJSONResponse:
+    """Run retrieval for a question and build the API response"""
+    include_context = fields is None or "context" in fields
+    headers = {}
+    profile_summary = None
+    qa = qa_system
+    if qa is not None:
+        filters = filters or {}
+        query = ocr.merge_query(question, image_text)
+        cache_key = (normalize_question(query), include_context, tuple(sorted(filters.items())))
+        try:
+            if profile:
+                # Profile this request's own work, not a coalesced or cached one
+                results, profile_summary = await profiled_retrieve(qa, query, include_context, filters)
+            else:
+                # Keyed on the index object too, so requests after a reload don't
+                # join a computation against the old index
+                results = await answer_flight.do(
+                    (id(qa),) + cache_key,
+                    retrieve,
+                    qa,
+                    query,
+                    include_context,
+                    filters
+                )
+            if qa is qa_system:
+                # Not after a reload, or the old index's answer would be cached
+                answer_cache.put(cache_key, results)
+        except Overloaded as e:
+            results, mode = await degraded_results(qa, query, include_context, filters, cache_key)
+            if results is None:
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Server is overloaded: {str(e)}",
+                    headers={"Retry-After": str(e.retry_after)}
+                )
+            DEGRADED_REQUESTS.inc(mode=mode)
+            headers["X-Degraded"] = mode
+
+        with metrics.span("response_build"):
+            body = answer_body(results)
+    else:
+        image_info = f"Image text: {image_text}" if image_text else ""
+        # Return response in the required format
+        with metrics.span("response_build"):
+            body = {
+                "answer": f"This is a test response from the deployed API. The system is working but using dummy data for testing. {image_info}",
+                "links": [
+                    {
+                        "url": "https://example.com/doc1",
+                        "text": "Example reference document 1"
+                    },
+                    {
+                        "url": "https://example.com/doc2",
+                        "text": "Example reference document 2"
+                    }
+                ],
+                "context": ""
+            }
+
+    with metrics.span("serialize"):
+        if fields is not None:
+            body = {key: value for key, value in body.items() if key in fields}
+        if profile_summary is not None:
+            body["profile"] = profile_summary
+        return ORJSONResponse(body, headers=headers)
+
+def sse_event(event: str, data: dict) -> bytes:
+    """Encode one server-sent event"""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+def stream_answer_events(question: str, image_text: str = "", include_context: bool = True,
+                         filters: Optional[dict] = None):
+    """
+    Yield an answer as server-sent events, most relevant hit first
+    Args:
+        question (str): The user's question
+        image_text (str): Text extracted from an attached image
+        include_context (bool): Send a context event for each hit after all hits
+        filters (dict): Metadata filters from search_filters()
+    Returns:
+        generator: "hit" events, then "context" events, then "done". With a
+            re-ranker, the first-stage top hit goes out first marked
+            provisional; the final hits follow, each replacing any earlier
+            hit of the same rank
+    """
+    # Use one index for the whole stream even if a reload swaps it meanwhile
+    qa = qa_system
+    try:
+        if qa is None:
+            yield sse_event("hit", {
+                "rank": 1,
+                "answer": "This is a test response from the deployed API. The system is working but using dummy data for testing.",
+                "similarity": 1.0,
+                "source_url": "https://example.com/doc1",
+                "source_title": "Example reference document 1"
+            })
+            yield sse_event("done", {"hits": 1})
+            return
+
+        query = ocr.merge_query(question, image_text)
+        hits = qa.first_stage(query, **(filters or {}))
+        if qa.will_rerank(hits):
+            # Re-ranking is the slow step; show the best first-stage hit meanwhile
+            idx, similarity = hits[0]
+            answer = qa.answer_dict(idx, similarity, include_context=False)
+            del answer['context']
+            yield sse_event("hit", {"rank": 1, "provisional": True, **answer})
+        hits = qa.rerank(query, hits)
+        if not hits:
+            from project1 import NO_ANSWER
+            answer = {key: value for key, value in NO_ANSWER.items() if key != 'context'}
+            yield sse_event("hit", {"rank": 1, **answer})
+            yield sse_event("done", {"hits": 0})
+            return
+
+        # Hits go out as soon as ranking is done; context assembly follows
+        for rank, (idx, similarity) in enumerate(hits, 1):
+            answer = qa.answer_dict(idx, similarity, include_context=False)
+            del answer['context']
+            yield sse_event("hit", {"rank": rank, **answer})
+
+        if include_context:
+            for rank, (idx, _) in enumerate(hits, 1):
+                with metrics.span("context"):
+                    context = qa.get_context(idx)
+                yield sse_event("context", {"rank": rank, "context": context})
+
+        yield sse_event("done", {"hits": len(hits)})
+    except Exception as e:
+        logger.error(f"Error streaming answer: {str(e)}")
+        yield sse_event("error", {"detail": f"Error processing request: {str(e)}"})
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """A streaming response that returns its admission slot when it finishes"""
+
+    async def __call__(self, scope, receive, send):
+        # Released here rather than in the body generator, which never starts
+        # if the client disconnects before the body is sent
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            admission.release()
+
+async def event_stream_response(events) -> StreamingResponse:
+    """Wrap an event generator in an unbuffered text/event-stream response"""
+    # Admit before any headers go out, so overload can still be a 503
+    try:
+        await admission.acquire()
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server is overloaded: {str(e)}",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    # A sync generator is iterated in the thread pool by StreamingResponse
+    return AdmittedStreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def require_admin(request: Request):
+    """Allow admin endpoints only with the X-Admin-Token matching ADMIN_TOKEN"""
+    token = os.environ.get("ADMIN_TOKEN")
+    if not token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if request.headers.get("x-admin-token") != token:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+def require_profiling(request: Request):
+    """Allow profiling only when PROFILING_ENABLED is set, and only for admins"""
+    if not profiling.is_enabled():
+        raise HTTPException(status_code=403, detail="Profiling is disabled")
+    require_admin(request)
+
+def check_ready():
+    """Raise 503 until data has been loaded"""
+    # embeddings stays None when search shards hold the matrix
+    if chunks is None:
+        raise HTTPException(
+            status_code=503,
+            detail="System is not initialized. Please ensure data is loaded."
+        )
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize resources on startup"""
+    global _watch_task
     load_data()
 
+    # Optionally pick up re-crawled content without a restart
+    data_file = os.environ.get("QA_DATA_FILE")
+    interval = float(os.environ.get("INDEX_WATCH_INTERVAL", 0))
+    if interval > 0 and qa_system is not None:
+        _watch_task = asyncio.create_task(watch_index_file(data_file, interval))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release worker processes on shutdown"""
+    if _watch_task is not None:
+        _watch_task.cancel()
+    if qa_system is not None:
+        qa_system.close()
+    ocr.shutdown()
+
 @app.get("/")
 async def root():
     """Root endpoint for health check"""
     return {"status": "healthy"}
 
-@app.post("/")
-async def answer_question(request: QuestionRequest):
+@app.post("/", response_model=Answer)
+async def answer_question(request: QuestionRequest, http_request: Request,
+                          fields: Optional[str] = None, profile: bool = False):
     """Answer a question about the TDS course, optionally with an image"""
-    if embeddings is None or chunks is None:
-        raise HTTPException(
-            status_code=503,
-            detail="System is not initialized. Please ensure data is loaded."
-        )
+    check_ready()
+    selected_fields = parse_fields(fields)
+    if profile:
+        require_profiling(http_request)
     
     try:
         # Process image if provided
-        image_info = ""
+        image_text = ""
         if request.image:
-            image_info = process_image(request.image)
+            with metrics.span("image"):
+                image_text = await process_image(request.image)
 
-        # Return response in the required format
-        return Answer(
-            answer=f"This is a test response from the deployed API. The system is working but using dummy data for testing. {image_info}",
-            links=[
-                Link(
-                    url="https://example.com/doc1",
-                    text="Example reference document 1"
-                ),
-                Link(
-                    url="https://example.com/doc2",
-                    text="Example reference document 2"
-                )
-            ]
+        filters = search_filters(request.source, request.start_date, request.end_date)
+        return await build_answer(request.question, image_text, selected_fields, filters, profile)
+    except HTTPException:
+        raise
+    except image_utils.ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error processing request: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing request: {str(e)}"
         )
+
+@app.post("/upload", response_model=Answer)
+async def answer_question_upload(request: Request, fields: Optional[str] = None,
+                                 profile: bool = False):
+    """Answer a question sent as multipart form data with an optional image file"""
+    check_ready()
+    selected_fields = parse_fields(fields)
+    if profile:
+        require_profiling(request)
+
+    try:
+        upload = await image_utils.read_multipart(request)
+    except image_utils.ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        question = upload.fields.get("question", "").strip()
+        if not question:
+            raise HTTPException(status_code=422, detail="Missing form field: question")
+        try:
+            filters = search_filters(
+                upload.fields.get("source"),
+                date.fromisoformat(upload.fields["start_date"]) if upload.fields.get("start_date") else None,
+                date.fromisoformat(upload.fields["end_date"]) if upload.fields.get("end_date") else None
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid date: {str(e)}")
+
+        image_text = ""
+        if upload.image is not None:
+            with metrics.span("image"):
+                image_text = await process_image_file(upload.image)
+
+        return await build_answer(question, image_text, selected_fields, filters, profile)
+    except HTTPException:
+        raise
+    except image_utils.ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Error processing request: {str(e)}"
         )
+    finally:
+        upload.close()
+
+@app.post("/stream")
+async def stream_answer(request: QuestionRequest, fields: Optional[str] = None):
+    """Stream the answer as server-sent events so the top hit arrives first"""
+    check_ready()
+    selected_fields = parse_fields(fields)
+
+    image_text = ""
+    if request.image:
+        try:
+            with metrics.span("image"):
+                image_text = await process_image(request.image)
+        except image_utils.ImageTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+    include_context = selected_fields is None or "context" in selected_fields
+    return await event_stream_response(
+        stream_answer_events(
+            request.question,
+            image_text,
+            include_context,
+            search_filters(request.source, request.start_date, request.end_date)
+        )
+    )
+
+@app.get("/stream")
+async def stream_answer_get(question: str, fields: Optional[str] = None, source: Optional[str] = None,
+                            start_date: Optional[date] = None, end_date: Optional[date] = None):
+    """EventSource-friendly variant of POST /stream for text-only questions"""
+    check_ready()
+    selected_fields = parse_fields(fields)
+    include_context = selected_fields is None or "context" in selected_fields
+    return await event_stream_response(stream_answer_events(
+        question, "", include_context, search_filters(source, start_date, end_date)
+    ))
+
+@app.post("/admin/reload", status_code=202)
+async def reload_endpoint(request: Request):
+    """Rebuild the index from QA_DATA_FILE in the background and swap it in"""
+    require_admin(request)
+    data_file = os.environ.get("QA_DATA_FILE")
+    if not data_file or not os.path.exists(data_file):
+        raise HTTPException(status_code=409, detail="QA_DATA_FILE is not set or missing")
+    if index_reloading:
+        raise HTTPException(status_code=409, detail="A reload is already in progress")
+
+    threading.Thread(target=reload_index, args=(data_file,), daemon=True).start()
+    return {"status": "reloading", "current_version": index_version}
+
+@app.post("/admin/profile")
+async def profile_endpoint(request: Request, seconds: float = 10.0, memory: bool = False,
+                           format: str = "json"):
+    """Sample the running process's CPU use (and optionally allocations) for some seconds"""
+    require_profiling(request)
+    if seconds <= 0:
+        raise HTTPException(status_code=400, detail="seconds must be positive")
+    try:
+        # The sampler runs in a worker thread and samples the event loop too
+        report = await run_in_threadpool(profiling.sample_cpu, seconds, memory=memory)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "collapsed":
+        return PlainTextResponse("\n".join(report["collapsed"]) + "\n")
+    return report
 
 @app.get("/health")
 async def health_check():
     """Check if the API is running and system is ready"""
     return {
         "status": "healthy",
-        "system_ready": embeddings is not None and chunks is not None
+        "system_ready": chunks is not None,
+        "index_version": index_version,
+        "index_loaded_at": index_loaded_at,
+        "index_reloading": index_reloading,
+        "last_reload_error": last_reload_error,
+        "requests": {
+            **answer_flight.stats(),
+            **admission.stats(),
+            "answer_cache_entries": len(answer_cache)
+        }
     }
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Expose latency histograms and counters in the Prometheus text format"""
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
 # Server startup
 if __name__ == "__main__":
     # Get port from environment variable or use default
@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import time
+
+import orjson
+
+from compression import brotli, compress
+from reranker import DEFAULT_RERANKER_MODEL, RERANK_FALLBACKS, CrossEncoderReranker
+
+
+def _time(func, repeat):
+    """Return mean seconds per call over repeat runs"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def _sample_results(hits, chunk_chars, jsonl_file='tds_content.jsonl'):
+    """Build get_answer style dicts of realistic size from crawled text"""
+    with open(jsonl_file, 'r', encoding='utf-8') as f:
+        corpus = " ".join(json.loads(line)['content'] for line in f)
+    # Repeat a small corpus so every hit gets distinct-looking text
+    corpus *= hits * 3 * chunk_chars // max(len(corpus), 1) + 1
+    pieces = [corpus[i * chunk_chars:(i + 1) * chunk_chars] for i in range(hits * 3)]
+    return [{
+        'answer': pieces[i * 3],
+        'similarity': 0.9 - i * 0.01,
+        'context': pieces[i * 3 + 1] + " " + pieces[i * 3 + 2],
+        'source_url': f"https://tds.s-anand.net/#/page-{i}",
+        'source_title': f"Page {i}"
+    } for i in range(hits)]
+
+
+def bench_serialization(args):
+    """Compare pydantic+json against plain dicts+orjson, and payload sizes"""
+    from fastapi.encoders import jsonable_encoder
+    from app import Answer, Link
+
+    results = _sample_results(args.hits, args.chunk_chars)
+
+    def via_pydantic():
+        model = Answer(
+            answer=results[0]['answer'],
+            links=[Link(url=r['source_url'], text=r['source_title']) for r in results],
+            context=results[0]['context']
+        )
+        return json.dumps(jsonable_encoder(model)).encode()
+
+    def via_orjson():
+        return orjson.dumps({
+            "answer": results[0]['answer'],
+            "links": [{"url": r['source_url'], "text": r['source_title']} for r in results],
+            "context": results[0]['context']
+        })
+
+    print(f"Serialization ({args.hits} hits, {args.chunk_chars} char chunks, {args.repeat} runs)")
+    print(f"  pydantic + json : {_time(via_pydantic, args.repeat) * 1e6:8.1f} us")
+    print(f"  dict + orjson   : {_time(via_orjson, args.repeat) * 1e6:8.1f} us")
+
+    full = orjson.dumps(results)
+    no_context = orjson.dumps([{k: v for k, v in r.items() if k != 'context'} for r in results])
+    print("Payload size for all hits")
+    print(f"  full            : {len(full):8d} bytes")
+    print(f"  without context : {len(no_context):8d} bytes")
+    print(f"  full, gzip      : {len(compress(full, 'gzip')):8d} bytes "
+          f"({_time(lambda: compress(full, 'gzip'), args.repeat) * 1e6:.1f} us)")
+    if brotli is not None:
+        print(f"  full, br        : {len(compress(full, 'br')):8d} bytes "
+              f"({_time(lambda: compress(full, 'br'), args.repeat) * 1e6:.1f} us)")
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def bench_rerank(args):
+    """Compare first-stage ranking with cross-encoder re-ranking on labelled queries"""
+    from project1 import QASystem
+
+    # Each line: {"question": "...", "url": "<url of the page that answers it>"}
+    with open(args.queries, 'r', encoding='utf-8') as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+
+    qa = QASystem(args.data)
+    reranker = CrossEncoderReranker(args.model, shortlist=args.shortlist, budget_ms=args.budget_ms)
+
+    print(f"Re-ranking ({len(queries)} queries, shortlist {args.shortlist}, budget {args.budget_ms} ms)")
+    for label, stage in (("bi-encoder", None), ("re-ranked", reranker)):
+        qa.reranker = stage
+        latencies, hits_at_1, reciprocal_ranks = [], 0, 0.0
+        for query in queries:
+            start = time.perf_counter()
+            hits = qa.search(query['question'], top_k=args.top_k, threshold=args.threshold)
+            latencies.append(time.perf_counter() - start)
+            urls = [qa.chunk_metadata[idx]['url'] for idx, _ in hits]
+            if query['url'] in urls:
+                rank = urls.index(query['url']) + 1
+                hits_at_1 += rank == 1
+                reciprocal_ranks += 1 / rank
+        print(f"  {label:10s}: hit@1 {hits_at_1 / len(queries):.3f}  "
+              f"MRR@{args.top_k} {reciprocal_ranks / len(queries):.3f}  "
+              f"p50 {_percentile(latencies, 50) * 1000:.1f} ms  "
+              f"p95 {_percentile(latencies, 95) * 1000:.1f} ms")
+    fallbacks = RERANK_FALLBACKS.value(reason="budget")
+    print(f"  fallbacks : {int(fallbacks)} of {len(queries)}")
+
+
+def bench_encode(args):
+    """Per-query encode latency for each encoder backend"""
+    from encoders import OnnxEncoder, SentenceTransformerEncoder
+
+    backends = [("torch", SentenceTransformerEncoder)]
+    if args.model_dir:
+        backends.append(("onnx", lambda: OnnxEncoder(args.model_dir, threads=args.threads)))
+        backends.append(("onnx int8", lambda: OnnxEncoder(args.model_dir, quantized=True, threads=args.threads)))
+
+    question = "How do I submit the project and what is the deadline?"
+    print(f"Query encode latency ({args.repeat} runs)")
+    for label, factory in backends:
+        encoder = factory()
+        encoder.encode([question])  # warm up
+        latencies = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            encoder.encode([question])
+            latencies.append(time.perf_counter() - start)
+        print(f"  {label:10s}: p50 {_percentile(latencies, 50) * 1000:.2f} ms  "
+              f"p95 {_percentile(latencies, 95) * 1000:.2f} ms")
+
+
+def bench_chunking(args):
+    """Compare the character and token-budget chunkers"""
+    from encoders import load_encoder
+    from project1 import QASystem
+
+    queries = []
+    if args.queries:
+        # Each line: {"question": "...", "url": "<url of the page that answers it>"}
+        with open(args.queries, 'r', encoding='utf-8') as f:
+            queries = [json.loads(line) for line in f if line.strip()]
+
+    encoder = load_encoder()
+    print(f"Chunking ({args.data}, target {args.target_tokens} tokens, overlap {args.overlap_tokens})")
+    for mode in ("chars", "tokens"):
+        os.environ["CHUNK_TARGET_TOKENS"] = str(args.target_tokens)
+        os.environ["CHUNK_OVERLAP_TOKENS"] = str(args.overlap_tokens)
+        start = time.perf_counter()
+        qa = QASystem(args.data, encoder=encoder, chunker=mode)
+        seconds = time.perf_counter() - start
+        tokens = [encoder.count_tokens(chunk) for chunk in qa.chunks]
+        line = (f"  {mode:6s}: {len(qa.chunks):6d} chunks  mean {sum(tokens) / max(len(tokens), 1):5.1f} tokens  "
+                f"build {seconds:6.2f} s  index {qa.embeddings.nbytes / 1e6:7.2f} MB")
+        if queries:
+            hits_at_1, reciprocal_ranks = 0, 0.0
+            for query in queries:
+                hits = qa.search(query['question'], top_k=args.top_k, threshold=args.threshold)
+                urls = [qa.chunk_metadata[idx]['url'] for idx, _ in hits]
+                if query['url'] in urls:
+                    rank = urls.index(query['url']) + 1
+                    hits_at_1 += rank == 1
+                    reciprocal_ranks += 1 / rank
+            line += f"  hit@1 {hits_at_1 / len(queries):.3f}  MRR@{args.top_k} {reciprocal_ranks / len(queries):.3f}"
+        print(line)
+
+
+def bench_build(args):
+    """Index build time and speedup for 1..N worker processes"""
+    import tempfile
+
+    import numpy as np
+
+    from index_builder import EMBEDDINGS_FILE, build_index
+
+    print(f"Index build scaling ({args.data})")
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        with tempfile.TemporaryDirectory() as output_dir:
+            manifest = build_index(args.data, output_dir, workers=workers, threads=args.threads)
+            embeddings = np.load(f"{output_dir}/{EMBEDDINGS_FILE}")
+        seconds = manifest['total_seconds']
+        if baseline is None:
+            baseline = (seconds, manifest['fingerprint'], embeddings)
+        # The merged index must not depend on how the work was split
+        same = manifest['fingerprint'] == baseline[1] and np.allclose(embeddings, baseline[2], atol=1e-5)
+        speedup = baseline[0] / seconds
+        print(f"  {workers:2d} workers x {manifest['threads']} threads: {seconds:7.2f} s  "
+              f"speedup {speedup:4.2f}x  efficiency {speedup / workers:4.0%}  "
+              f"{'identical' if same else 'DIFFERS'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the QA service")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serialization = subparsers.add_parser("serialization", help="Response serialization and compression")
+    serialization.add_argument("--hits", type=int, default=10)
+    serialization.add_argument("--chunk-chars", type=int, default=600)
+    serialization.add_argument("--repeat", type=int, default=2000)
+    serialization.set_defaults(func=bench_serialization)
+
+    rerank = subparsers.add_parser("rerank", help="Quality and latency of cross-encoder re-ranking")
+    rerank.add_argument("--queries", required=True, help="JSONL of {question, url} pairs")
+    rerank.add_argument("--data", default="tds_content.jsonl")
+    rerank.add_argument("--model", default=DEFAULT_RERANKER_MODEL)
+    rerank.add_argument("--shortlist", type=int, default=50)
+    rerank.add_argument("--budget-ms", type=float, default=150.0)
+    rerank.add_argument("--top-k", type=int, default=3)
+    rerank.add_argument("--threshold", type=float, default=0.2)
+    rerank.set_defaults(func=bench_rerank)
+
+    encode = subparsers.add_parser("encode", help="Query encode latency per encoder backend")
+    encode.add_argument("--model-dir", help="Exported ONNX model directory from encoders.py export")
+    encode.add_argument("--threads", type=int, default=None)
+    encode.add_argument("--repeat", type=int, default=200)
+    encode.set_defaults(func=bench_encode)
+
+    chunking = subparsers.add_parser("chunking", help="Character vs token-budget chunking")
+    chunking.add_argument("--data", default="tds_content.jsonl")
+    chunking.add_argument("--queries", help="JSONL of {question, url} pairs for retrieval quality")
+    chunking.add_argument("--target-tokens", type=int, default=200)
+    chunking.add_argument("--overlap-tokens", type=int, default=32)
+    chunking.add_argument("--top-k", type=int, default=3)
+    chunking.add_argument("--threshold", type=float, default=0.2)
+    chunking.set_defaults(func=bench_chunking)
+
+    build = subparsers.add_parser("build", help="Parallel index build scaling")
+    build.add_argument("--data", default="tds_content.jsonl")
+    build.add_argument("--max-workers", type=int, default=4)
+    build.add_argument("--threads", type=int, default=None, help="Threads per worker")
+    build.set_defaults(func=bench_build)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
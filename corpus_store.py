@@ -0,0 +1,356 @@
+import os
+import json
+import zlib
+import argparse
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# zstd compresses and decompresses faster than zlib when it is installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MANIFEST_FILE = 'manifest.json'
+DEFAULT_BLOCK_BYTES = 64 * 1024
+DEFAULT_CACHE_BLOCKS = 64
+
+
+def _compress(codec, data):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(codec, data):
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class CorpusStore:
+    """
+    Append-only, segmented store of crawled records with random access
+
+    Each segment is a data file of independently compressed blocks of JSON
+    lines plus an index file mapping doc ids to (block, position). A record
+    appended again under the same URL supersedes the older copy, which is
+    dropped on compaction. The manifest lists the live segments and is
+    replaced atomically, so readers never see a half-written segment. A
+    store opens its segment files once and keeps the handles, so a live
+    reader keeps working after another process compacts the segments away.
+    """
+
+    def __init__(self, path, codec=None, block_bytes=DEFAULT_BLOCK_BYTES,
+                 cache_blocks=DEFAULT_CACHE_BLOCKS):
+        """
+        Open a store, creating it if the directory has no manifest
+        Args:
+            path (str): Store directory
+            codec (str): "zstd" or "zlib" for new segments; defaults to zstd
+                when the zstandard package is installed
+            block_bytes (int): Uncompressed size at which a block is closed
+            cache_blocks (int): Decompressed blocks kept in memory
+        """
+        self.path = path
+        self.codec = codec or ('zstd' if zstandard is not None else 'zlib')
+        if self.codec == 'zstd' and zstandard is None:
+            raise ValueError("zstd codec needs the zstandard package")
+        self.block_bytes = block_bytes
+        self.cache_blocks = cache_blocks
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        else:
+            manifest = {'next_id': 0, 'next_segment': 0, 'segments': []}
+        self.next_id = manifest['next_id']
+        self.next_segment = manifest['next_segment']
+        self.segments = manifest['segments']
+
+        # doc id -> (segment, block, position) and url; url -> latest doc id
+        self._locations = {}
+        self._doc_urls = {}
+        self._urls = {}
+        self._segment_info = {}
+        self._files = {}
+        for segment in self.segments:
+            self._load_segment_index(segment)
+
+    @staticmethod
+    def is_store(path):
+        """Whether path is a corpus store directory"""
+        return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+    def _load_segment_index(self, segment):
+        with open(os.path.join(self.path, segment + '.idx'), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self._segment_info[segment] = index
+        self._files[segment] = open(os.path.join(self.path, segment + '.dat'), 'rb')
+        for doc_id, url, block, position in index['docs']:
+            self._locations[doc_id] = (segment, block, position)
+            if url:
+                self._doc_urls[doc_id] = url
+                self._urls[url] = doc_id
+
+    def _write_manifest(self):
+        manifest = {
+            'next_id': self.next_id,
+            'next_segment': self.next_segment,
+            'segments': self.segments
+        }
+        tmp_path = os.path.join(self.path, MANIFEST_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST_FILE))
+
+    def _write_segment(self, records):
+        """Write (doc id, record) pairs as a new segment and return its name"""
+        segment = f"seg-{self.next_segment:06d}"
+        self.next_segment += 1
+        blocks = []
+        docs = []
+        lines = []
+        size = 0
+
+        with open(os.path.join(self.path, segment + '.dat'), 'wb') as f:
+            def flush():
+                data = _compress(self.codec, b'\n'.join(lines))
+                blocks.append([f.tell(), len(data)])
+                f.write(data)
+
+            for doc_id, record in records:
+                line = json.dumps(record, ensure_ascii=False).encode('utf-8')
+                docs.append([doc_id, record.get('url'), len(blocks), len(lines)])
+                lines.append(line)
+                size += len(line)
+                if size >= self.block_bytes:
+                    flush()
+                    lines, size = [], 0
+            if lines:
+                flush()
+            f.flush()
+            os.fsync(f.fileno())
+
+        index = {'codec': self.codec, 'blocks': blocks, 'docs': docs}
+        with open(os.path.join(self.path, segment + '.idx'), 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        return segment
+
+    def append(self, records):
+        """
+        Add records as a new segment
+        Args:
+            records (iterable): Crawled records (dicts with url, content, ...)
+        Returns:
+            list: Doc ids assigned to the records, in order
+        """
+        numbered = []
+        for record in records:
+            numbered.append((self.next_id, record))
+            self.next_id += 1
+        if not numbered:
+            return []
+
+        segment = self._write_segment(numbered)
+        self.segments.append(segment)
+        self._write_manifest()
+        self._load_segment_index(segment)
+        return [doc_id for doc_id, _ in numbered]
+
+    def _read_block(self, segment, block):
+        key = (segment, block)
+        with self._lock:
+            lines = self._cache.get(key)
+            if lines is not None:
+                self._cache.move_to_end(key)
+                return lines
+
+        index = self._segment_info[segment]
+        offset, length = index['blocks'][block]
+        data = self._read_at(self._files[segment], offset, length)
+        lines = _decompress(index['codec'], data).split(b'\n')
+
+        with self._lock:
+            self._cache[key] = lines
+            while len(self._cache) > self.cache_blocks:
+                self._cache.popitem(last=False)
+        return lines
+
+    def _read_at(self, f, offset, length):
+        if hasattr(os, 'pread'):
+            return os.pread(f.fileno(), length, offset)
+        with self._lock:
+            f.seek(offset)
+            return f.read(length)
+
+    def close(self):
+        """Close the segment file handles"""
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def get(self, doc_id):
+        """
+        Fetch one record by doc id, decompressing only its block
+        Args:
+            doc_id (int): Id returned by append()
+        Returns:
+            dict: The record
+        Raises:
+            KeyError: If there is no such document
+        """
+        segment, block, position = self._locations[doc_id]
+        return json.loads(self._read_block(segment, block)[position])
+
+    def get_by_url(self, url):
+        """Fetch the latest record stored for a URL, or None"""
+        doc_id = self._urls.get(url)
+        return self.get(doc_id) if doc_id is not None else None
+
+    def is_live(self, doc_id):
+        """Whether a doc exists and has not been superseded by a newer record for its URL"""
+        if doc_id not in self._locations:
+            return False
+        url = self._doc_urls.get(doc_id)
+        return url is None or self._urls[url] == doc_id
+
+    def ids(self):
+        """Live doc ids in insertion order"""
+        # Segments are loaded oldest first, so _locations is in id order
+        return [doc_id for doc_id in self._locations if self.is_live(doc_id)]
+
+    def items(self):
+        """Iterate (doc id, record) for live records, reading block by block"""
+        for doc_id in self.ids():
+            yield doc_id, self.get(doc_id)
+
+    def __iter__(self):
+        for _, record in self.items():
+            yield record
+
+    def __len__(self):
+        return len(self.ids())
+
+    def compact(self):
+        """
+        Rewrite live records into one segment and delete the old segments
+        Returns:
+            int: Number of superseded records dropped
+        """
+        live = self.ids()
+        dropped = len(self._locations) - len(live)
+        old_segments = list(self.segments)
+
+        segment = self._write_segment((doc_id, self.get(doc_id)) for doc_id in live)
+        self.segments = [segment]
+        self._write_manifest()
+
+        self._locations.clear()
+        self._doc_urls.clear()
+        self._urls.clear()
+        self._segment_info.clear()
+        with self._lock:
+            self._cache.clear()
+        self.close()
+        self._load_segment_index(segment)
+
+        # Other processes reading the old segments hold open handles, which
+        # keep the data readable after the names are removed
+        for old in old_segments:
+            for suffix in ('.dat', '.idx'):
+                try:
+                    os.remove(os.path.join(self.path, old + suffix))
+                except OSError as e:
+                    logger.warning(f"Could not remove {old}{suffix}: {str(e)}")
+        logger.info(f"Compacted {len(old_segments)} segments into {segment}, dropped {dropped} records")
+        return dropped
+
+    def import_jsonl(self, jsonl_file, batch_size=10000):
+        """
+        Append the records of a JSONL file, one segment per batch
+        Args:
+            jsonl_file (str): Crawled JSONL file
+            batch_size (int): Records per segment
+        Returns:
+            int: Number of records imported
+        """
+        imported = 0
+        batch = []
+        with open(jsonl_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    imported += len(self.append(batch))
+                    batch = []
+        imported += len(self.append(batch))
+        return imported
+
+    def export_jsonl(self, jsonl_file):
+        """
+        Write the live records as a JSONL file
+        Args:
+            jsonl_file (str): Output path
+        Returns:
+            int: Number of records written
+        """
+        written = 0
+        with open(jsonl_file, 'w', encoding='utf-8') as f:
+            for record in self:
+                f.write(json.dumps(record) + '\n')
+                written += 1
+        return written
+
+    def stats(self):
+        data_bytes = sum(
+            os.path.getsize(os.path.join(self.path, segment + '.dat')) for segment in self.segments
+        )
+        return {
+            'segments': len(self.segments),
+            'documents': len(self),
+            'superseded': len(self._locations) - len(self),
+            'data_bytes': data_bytes,
+            'codec': self.codec
+        }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Manage a segmented corpus store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_cmd = subparsers.add_parser("import", help="Append a JSONL file to a store")
+    import_cmd.add_argument("jsonl")
+    import_cmd.add_argument("store")
+    import_cmd.add_argument("--codec", choices=["zstd", "zlib"])
+
+    export_cmd = subparsers.add_parser("export", help="Write a store's live records as JSONL")
+    export_cmd.add_argument("store")
+    export_cmd.add_argument("jsonl")
+
+    compact_cmd = subparsers.add_parser("compact", help="Merge segments and drop superseded records")
+    compact_cmd.add_argument("store")
+
+    stats_cmd = subparsers.add_parser("stats", help="Show segment and document counts")
+    stats_cmd.add_argument("store")
+
+    args = parser.parse_args()
+    if args.command == "import":
+        count = CorpusStore(args.store, codec=args.codec).import_jsonl(args.jsonl)
+        print(f"Imported {count} records into {args.store}")
+    elif args.command == "export":
+        count = CorpusStore(args.store).export_jsonl(args.jsonl)
+        print(f"Exported {count} records to {args.jsonl}")
+    elif args.command == "compact":
+        dropped = CorpusStore(args.store).compact()
+        print(f"Dropped {dropped} superseded records")
+    else:
+        print(json.dumps(CorpusStore(args.store).stats(), indent=2))
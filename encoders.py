@@ -0,0 +1,255 @@
+import os
+import sys
+import argparse
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+HUB_MODEL_ID = 'sentence-transformers/all-MiniLM-L6-v2'
+ONNX_FILE = 'model.onnx'
+QUANTIZED_ONNX_FILE = 'model.int8.onnx'
+# Lowest cosine between an ONNX embedding and the PyTorch one that passes;
+# int8 weights cost a little agreement, so that model gets a looser bound
+MIN_PARITY_COSINE = 0.99
+MIN_QUANTIZED_PARITY_COSINE = 0.98
+
+
+class SentenceTransformerEncoder:
+    """PyTorch sentence-transformers backend"""
+
+    def __init__(self, model_name=DEFAULT_MODEL):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts, batch_size=32):
+        """
+        Embed texts
+        Args:
+            texts (list): Texts to embed
+            batch_size (int): Texts per forward pass
+        Returns:
+            numpy.ndarray: One row per text
+        """
+        return self.model.encode(texts, batch_size=batch_size, show_progress_bar=False)
+
+    def count_tokens(self, text):
+        """Number of model tokens in text, without special tokens"""
+        return len(self.model.tokenizer.tokenize(text))
+
+
+class OnnxEncoder:
+    """ONNX Runtime backend for an exported (optionally int8) MiniLM model"""
+
+    def __init__(self, model_dir, quantized=False, threads=None, max_length=256):
+        """
+        Load an exported model and its tokenizer
+        Args:
+            model_dir (str): Directory written by export_onnx()
+            quantized (bool): Use the int8 dynamically quantized model
+            threads (int): Intra-op threads; None lets ONNX Runtime decide
+            max_length (int): Token limit per text, as in sentence-transformers
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Queries are single small batches; parallelism only pays off inside ops
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+
+        model_file = QUANTIZED_ONNX_FILE if quantized else ONNX_FILE
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file),
+            options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        # The exported tokenizer is loaded once and reused for every call
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_length = max_length
+
+    def count_tokens(self, text):
+        """Number of model tokens in text, without special tokens"""
+        return len(self.tokenizer.tokenize(text))
+
+    def _encode_batch(self, texts):
+        tokens = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np"
+        )
+        feeds = {name: tokens[name].astype(np.int64) for name in self.input_names}
+        hidden = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalisation, as the
+        # sentence-transformers pipeline for this model does
+        mask = tokens["attention_mask"][..., None].astype(hidden.dtype)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def encode(self, texts, batch_size=32):
+        """
+        Embed texts
+        Args:
+            texts (list): Texts to embed
+            batch_size (int): Texts per forward pass
+        Returns:
+            numpy.ndarray: One row per text, in input order
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # Batch texts of similar length together to keep padding small
+        order = np.argsort([len(text) for text in texts])
+        embeddings = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            batch_order = order[start:start + batch_size]
+            batch = self._encode_batch([texts[i] for i in batch_order])
+            if embeddings.shape[1] == 0:
+                embeddings = np.empty((len(texts), batch.shape[1]), dtype=batch.dtype)
+            embeddings[batch_order] = batch
+        return embeddings
+
+
+def load_encoder(backend=None, model_dir=None, quantized=None, threads=None):
+    """
+    Create the query/index encoder selected by arguments or environment
+    Args:
+        backend (str): "torch" (default) or "onnx"; falls back to ENCODER_BACKEND
+        model_dir (str): Exported model directory; falls back to ONNX_MODEL_DIR
+        quantized (bool): Use the int8 model; falls back to ONNX_QUANTIZED
+        threads (int): Intra-op threads; falls back to ENCODER_THREADS
+    Returns:
+        SentenceTransformerEncoder or OnnxEncoder
+    """
+    backend = backend or os.environ.get("ENCODER_BACKEND", "torch")
+    if backend == "torch":
+        return SentenceTransformerEncoder()
+    if backend == "onnx":
+        model_dir = model_dir or os.environ.get("ONNX_MODEL_DIR", "onnx_model")
+        if quantized is None:
+            quantized = os.environ.get("ONNX_QUANTIZED", "").lower() in ("1", "true", "yes")
+        threads = threads or int(os.environ.get("ENCODER_THREADS", 0)) or None
+        logger.info(f"Using ONNX encoder from {model_dir} (quantized={quantized}, threads={threads})")
+        return OnnxEncoder(model_dir, quantized=quantized, threads=threads)
+    raise ValueError(f"Unknown encoder backend: {backend}")
+
+
+def export_onnx(output_dir, model_id=HUB_MODEL_ID, quantize=True, opset=14):
+    """
+    Export the transformer behind the sentence-transformers model to ONNX
+    Args:
+        output_dir (str): Directory for the model and tokenizer files
+        model_id (str): Hugging Face model id
+        quantize (bool): Also write an int8 dynamically quantized copy
+        opset (int): ONNX opset version
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModel.from_pretrained(model_id)
+    model.eval()
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    onnx_path = os.path.join(output_dir, ONNX_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            onnx_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                **{name: {0: "batch", 1: "sequence"} for name in input_names},
+                "last_hidden_state": {0: "batch", 1: "sequence"}
+            },
+            opset_version=opset
+        )
+    logger.info(f"Exported {model_id} to {onnx_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = os.path.join(output_dir, QUANTIZED_ONNX_FILE)
+        quantize_dynamic(onnx_path, quantized_path, weight_type=QuantType.QInt8)
+        logger.info(f"Wrote int8 quantized model to {quantized_path}")
+
+
+def check_parity(reference, candidate, texts):
+    """
+    Compare embeddings from two encoders
+    Args:
+        reference: Encoder treated as ground truth
+        candidate: Encoder under test
+        texts (list): Texts to embed with both
+    Returns:
+        numpy.ndarray: Cosine similarity between the two embeddings of each text
+    """
+    a = np.asarray(reference.encode(texts), dtype=np.float32)
+    b = np.asarray(candidate.encode(texts), dtype=np.float32)
+    a /= np.linalg.norm(a, axis=1, keepdims=True)
+    b /= np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def _parity_texts(jsonl_file, limit):
+    """Questions plus crawled chunks to compare encoders on"""
+    texts = [
+        "What is the course about?",
+        "How do I submit graded assignment 1?",
+        "docker: permission denied while trying to connect to the Docker daemon socket",
+    ]
+    if os.path.exists(jsonl_file):
+        import json
+        with open(jsonl_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                content = json.loads(line)['content']
+                texts.extend(p.strip() for p in content.split('\n') if len(p.strip()) > 20)
+    return texts[:limit]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Export and verify the ONNX query encoder")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="Export the model to ONNX")
+    export.add_argument("--output", default="onnx_model")
+    export.add_argument("--no-quantize", action="store_true")
+
+    parity = subparsers.add_parser("parity", help="Check ONNX embeddings against PyTorch")
+    parity.add_argument("--model-dir", default="onnx_model")
+    parity.add_argument("--quantized", action="store_true")
+    parity.add_argument("--data", default="tds_content.jsonl")
+    parity.add_argument("--limit", type=int, default=200)
+    parity.add_argument("--min-cosine", type=float,
+                        help=f"Defaults to {MIN_PARITY_COSINE}, or {MIN_QUANTIZED_PARITY_COSINE} with --quantized")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_onnx(args.output, quantize=not args.no_quantize)
+    else:
+        texts = _parity_texts(args.data, args.limit)
+        if args.min_cosine is None:
+            args.min_cosine = MIN_QUANTIZED_PARITY_COSINE if args.quantized else MIN_PARITY_COSINE
+        cosines = check_parity(
+            SentenceTransformerEncoder(),
+            OnnxEncoder(args.model_dir, quantized=args.quantized),
+            texts
+        )
+        print(f"{len(texts)} texts: min cosine {cosines.min():.5f}, mean {cosines.mean():.5f}")
+        if cosines.min() < args.min_cosine:
+            print(f"FAILED: embeddings disagree below {args.min_cosine}")
+            sys.exit(1)
+        print("OK")
@@ -6,16 +6,23 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import os
 import json
 import time
 import logging
 from config import AuthConfig
+from http_cache import CachedFetcher, docsify_source_url
+from page_parsers import parse_course_page, parse_links, parse_topic_list, parse_topic_page
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Processes that parse page snapshots while the browser renders the next page
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", os.cpu_count() or 2))
+
 class TDSContentCrawler:
     def __init__(self, auth_config: AuthConfig = None):
         """Initialize the crawler with optional authentication"""
@@ -38,6 +45,9 @@ class TDSContentCrawler:
         )
         self.wait = WebDriverWait(self.driver, 20)
         logger.info("Chrome driver initialized successfully")
+        
+        # Conditional-request cache shared by re-crawls
+        self.fetcher = CachedFetcher()
     
     def login_to_course(self):
         """Login to the course website"""
@@ -145,7 +155,7 @@ class TDSContentCrawler:
             # Wait for sidebar to load
             logger.info("Waiting for sidebar to load...")
             try:
-                sidebar = self.wait.until(
+                self.wait.until(
                     EC.presence_of_element_located((By.CLASS_NAME, 'sidebar'))
                 )
                 logger.info("Sidebar loaded successfully")
@@ -154,42 +164,66 @@ class TDSContentCrawler:
                 logger.info(f"Page source: {self.driver.page_source[:500]}...")
                 return content_data
             
-            # Get all links from sidebar
-            links = sidebar.find_elements(By.TAG_NAME, 'a')
+            # Read every sidebar link from one snapshot of the page
+            links = parse_links(self.driver.page_source, self.driver.current_url, 'sidebar')
             logger.info(f"Found {len(links)} links in sidebar")
             
-            for i, link in enumerate(links):
-                try:
-                    href = link.get_attribute('href')
-                    if not href:
+            # Pages are rendered one at a time in the browser while earlier
+            # snapshots are parsed in the pool
+            entries = []
+            with ProcessPoolExecutor(max_workers=PARSE_WORKERS) as pool:
+                for i, href in enumerate(links):
+                    try:
+                        logger.info(f"Processing link {i+1}/{len(links)}: {href}")
+                        
+                        # Skip rendering when the page's markdown source is unchanged
+                        source = None
+                        try:
+                            source = self.fetcher.fetch(docsify_source_url(href))
+                            cached_item = self.fetcher.get_parsed(source)
+                            if cached_item:
+                                logger.info(f"Unchanged since last crawl: {href}")
+                                entries.append((href, source, cached_item))
+                                continue
+                        except Exception as e:
+                            logger.warning(f"Could not revalidate {href}: {str(e)}")
+                        
+                        # Navigate to the page
+                        self.driver.get(href)
+                        time.sleep(2)
+                        
+                        # Wait for content to load
+                        self.wait.until(
+                            EC.presence_of_element_located((By.CLASS_NAME, 'content'))
+                        )
+                        
+                        entries.append((href, source, pool.submit(parse_course_page, self.driver.page_source)))
+                        
+                    except Exception as e:
+                        logger.error(f"Error processing page {href}: {str(e)}")
                         continue
+                
+                for href, source, parsed in entries:
+                    if isinstance(parsed, dict):
+                        content_data.append(parsed)
+                        continue
+                    try:
+                        page = parsed.result()
+                    except Exception as e:
+                        logger.error(f"Error parsing page {href}: {str(e)}")
+                        continue
+                    logger.info(f"Successfully extracted content from {href} ({len(page['content'])} chars)")
                     
-                    logger.info(f"Processing link {i+1}/{len(links)}: {href}")
-                    
-                    # Navigate to the page
-                    self.driver.get(href)
-                    time.sleep(2)
-                    
-                    # Wait for content to load
-                    main_content = self.wait.until(
-                        EC.presence_of_element_located((By.CLASS_NAME, 'content'))
-                    )
-                    
-                    # Extract content
-                    page_content = main_content.text
-                    logger.info(f"Successfully extracted content from {href} ({len(page_content)} chars)")
-                    
-                    content_data.append({
+                    item = {
                         'url': href,
-                        'title': self.driver.title,
-                        'content': page_content,
+                        'title': page['title'],
+                        'content': page['content'],
                         'source': 'course',
                         'timestamp': datetime.now().isoformat()
-                    })
-                    
-                except Exception as e:
-                    logger.error(f"Error processing page {href}: {str(e)}")
-                    continue
+                    }
+                    content_data.append(item)
+                    if source:
+                        self.fetcher.put_parsed(source, item)
                     
         except Exception as e:
             logger.error(f"Error crawling course content: {str(e)}")
@@ -226,64 +260,64 @@ class TDSContentCrawler:
             # Wait for topics to load
             try:
                 logger.info("Waiting for topics to load...")
-                topics = self.wait.until(
+                self.wait.until(
                     EC.presence_of_all_elements_located((By.CLASS_NAME, 'topic-list-item'))
                 )
-                logger.info(f"Found {len(topics)} topics")
             except Exception as e:
                 logger.error(f"Failed to load topics: {str(e)}")
                 logger.info(f"Page source: {self.driver.page_source[:500]}...")
                 return forum_data
             
-            for i, topic in enumerate(topics):
-                try:
-                    logger.info(f"Processing topic {i+1}/{len(topics)}")
-                    
-                    # Get topic link
-                    topic_link = topic.find_element(By.CLASS_NAME, 'title').find_element(By.TAG_NAME, 'a')
-                    topic_url = topic_link.get_attribute('href')
-                    
-                    # Get topic date
-                    date_str = topic.find_element(By.CLASS_NAME, 'last-posting-date').text
-                    topic_date = datetime.strptime(date_str, '%b %d, %Y')
-                    
-                    # Only process topics from Jan 1, 2025 to Apr 14, 2025
-                    start_date = datetime(2025, 1, 1)
-                    end_date = datetime(2025, 4, 14)
-                    
-                    if start_date <= topic_date <= end_date:
-                        logger.info(f"Topic date {topic_date} is within range, processing...")
-                        
-                        # Navigate to topic
-                        self.driver.get(topic_url)
-                        time.sleep(2)
-                        
-                        # Wait for posts to load
-                        posts = self.wait.until(
-                            EC.presence_of_all_elements_located((By.CLASS_NAME, 'topic-post'))
-                        )
-                        
-                        # Extract content from all posts
-                        topic_content = []
-                        for post in posts:
-                            post_content = post.find_element(By.CLASS_NAME, 'post-content').text
-                            topic_content.append(post_content)
-                        
-                        logger.info(f"Extracted {len(topic_content)} posts from topic")
-                        
-                        forum_data.append({
-                            'url': topic_url,
-                            'title': self.driver.title,
-                            'content': '\n\n'.join(topic_content),
-                            'source': 'forum',
-                            'timestamp': topic_date.isoformat()
-                        })
-                    else:
-                        logger.info(f"Topic date {topic_date} is outside target range, skipping")
+            # Read links and dates of all topics from one snapshot of the page
+            topics = parse_topic_list(self.driver.page_source, self.driver.current_url)
+            logger.info(f"Found {len(topics)} topics")
+            
+            # Only process topics from Jan 1, 2025 to Apr 14, 2025
+            start_date = datetime(2025, 1, 1)
+            end_date = datetime(2025, 4, 14)
+            
+            pending = []
+            with ProcessPoolExecutor(max_workers=PARSE_WORKERS) as pool:
+                for i, (topic_url, date_str) in enumerate(topics):
+                    try:
+                        logger.info(f"Processing topic {i+1}/{len(topics)}")
+                        topic_date = datetime.strptime(date_str, '%b %d, %Y')
                         
-                except Exception as e:
-                    logger.error(f"Error processing topic: {str(e)}")
-                    continue
+                        if start_date <= topic_date <= end_date:
+                            logger.info(f"Topic date {topic_date} is within range, processing...")
+                            
+                            # Navigate to topic
+                            self.driver.get(topic_url)
+                            time.sleep(2)
+                            
+                            # Wait for posts to load
+                            self.wait.until(
+                                EC.presence_of_all_elements_located((By.CLASS_NAME, 'topic-post'))
+                            )
+                            
+                            pending.append((topic_url, topic_date, pool.submit(parse_topic_page, self.driver.page_source)))
+                        else:
+                            logger.info(f"Topic date {topic_date} is outside target range, skipping")
+                            
+                    except Exception as e:
+                        logger.error(f"Error processing topic: {str(e)}")
+                        continue
+                
+                for topic_url, topic_date, future in pending:
+                    try:
+                        topic = future.result()
+                    except Exception as e:
+                        logger.error(f"Error parsing topic {topic_url}: {str(e)}")
+                        continue
+                    logger.info(f"Extracted {len(topic['posts'])} posts from topic")
+                    
+                    forum_data.append({
+                        'url': topic_url,
+                        'title': topic['title'],
+                        'content': '\n\n'.join(topic['posts']),
+                        'source': 'forum',
+                        'timestamp': topic_date.isoformat()
+                    })
                     
         except Exception as e:
             logger.error(f"Error crawling forum content: {str(e)}")
@@ -315,6 +349,10 @@ class TDSContentCrawler:
                     
             logger.info(f"Successfully crawled and saved {len(all_data)} pages")
             
+            self.fetcher.save()
+            pruned = self.fetcher.prune()
+            logger.info(f"HTTP cache: {self.fetcher.report()}; pruned {pruned} stale bodies")
+            
         except Exception as e:
             logger.error(f"Error during crawling: {str(e)}")
         
@@ -0,0 +1,176 @@
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = '.crawl_cache'
+
+
+def docsify_source_url(url):
+    """
+    Map a docsify page URL to the markdown file the browser renders for it
+    Args:
+        url (str): Page URL such as https://tds.s-anand.net/#/2025-01/docker
+    Returns:
+        str: Markdown URL such as https://tds.s-anand.net/2025-01/docker.md
+    """
+    base, _, route = url.partition('#/')
+    route = route.split('?')[0]
+    path = route + 'README.md' if not route or route.endswith('/') else route + '.md'
+    return base.rstrip('/') + '/' + path
+
+
+class FetchResult:
+    """A fetched body and whether it differs from the previous run"""
+
+    def __init__(self, url, status, body, sha256, changed):
+        self.url = url
+        self.status = status
+        self.body = body
+        self.sha256 = sha256
+        self.changed = changed
+
+
+class CachedFetcher:
+    """
+    HTTP fetcher backed by a content-addressed on-disk cache
+
+    Bodies are stored once per SHA-256 under objects/, and index.json maps
+    each URL to its ETag, Last-Modified, body hash and the record parsed
+    from it, so re-crawls send conditional requests and reuse parsed
+    records for pages that did not change.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, session=None, timeout=30):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+
+        self.stats = {
+            'requests': 0,
+            'not_modified': 0,
+            'unchanged': 0,
+            'changed': 0,
+            'bytes_downloaded': 0,
+            'bytes_saved': 0
+        }
+
+    def _object_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def _read_object(self, sha256):
+        with open(self._object_path(sha256), 'rb') as f:
+            return f.read()
+
+    def _write_object(self, sha256, body):
+        path = self._object_path(sha256)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    def fetch(self, url, headers=None):
+        """
+        GET a URL, revalidating a cached copy when there is one
+        Args:
+            url (str): URL to fetch
+            headers (dict): Extra request headers
+        Returns:
+            FetchResult: Body (from cache on 304) and whether it changed
+        """
+        entry = self.index.get(url)
+        request_headers = dict(headers or {})
+        if entry and os.path.exists(self._object_path(entry['sha256'])):
+            if entry.get('etag'):
+                request_headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request_headers['If-Modified-Since'] = entry['last_modified']
+        else:
+            entry = None
+
+        response = self.session.get(url, headers=request_headers, timeout=self.timeout)
+        self.stats['requests'] += 1
+
+        if response.status_code == 304 and entry is not None:
+            self.stats['not_modified'] += 1
+            self.stats['bytes_saved'] += entry['size']
+            logger.debug(f"Not modified: {url}")
+            entry['checked_at'] = datetime.now().isoformat()
+            return FetchResult(url, 304, self._read_object(entry['sha256']), entry['sha256'], False)
+
+        response.raise_for_status()
+        body = response.content
+        sha256 = hashlib.sha256(body).hexdigest()
+        self.stats['bytes_downloaded'] += len(body)
+
+        changed = entry is None or entry['sha256'] != sha256
+        self.stats['changed' if changed else 'unchanged'] += 1
+        if changed:
+            self._write_object(sha256, body)
+
+        self.index[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': sha256,
+            'size': len(body),
+            'checked_at': datetime.now().isoformat(),
+            # A parsed record stays valid only while the body is unchanged
+            'parsed': None if changed else entry.get('parsed')
+        }
+        return FetchResult(url, response.status_code, body, sha256, changed)
+
+    def get_parsed(self, result):
+        """Return the record parsed from this body on an earlier run, if unchanged"""
+        if result.changed:
+            return None
+        return self.index.get(result.url, {}).get('parsed')
+
+    def put_parsed(self, result, record):
+        """Remember the record parsed from a fetched body"""
+        entry = self.index.get(result.url)
+        if entry is not None and entry['sha256'] == result.sha256:
+            entry['parsed'] = record
+
+    def prune(self):
+        """Delete stored bodies no longer referenced by any URL"""
+        referenced = {entry['sha256'] for entry in self.index.values()}
+        removed = 0
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                if name not in referenced:
+                    os.remove(os.path.join(prefix_dir, name))
+                    removed += 1
+        return removed
+
+    def save(self):
+        """Write the URL index to disk atomically"""
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def report(self):
+        """Summarise requests and bytes saved during this run"""
+        s = self.stats
+        return (
+            f"{s['requests']} requests: {s['not_modified']} not modified, "
+            f"{s['unchanged']} unchanged, {s['changed']} new or changed; "
+            f"{s['bytes_downloaded']} bytes downloaded, {s['bytes_saved']} bytes saved"
+        )
@@ -0,0 +1,257 @@
+import os
+import base64
+import hashlib
+import logging
+import threading
+import tempfile
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from multipart.multipart import MultipartParser, parse_options_header
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Upload limits, overridable from the environment
+MAX_IMAGE_BYTES = int(os.environ.get("MAX_IMAGE_BYTES", 5 * 1024 * 1024))
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", 40_000_000))
+MAX_IMAGE_SIDE = int(os.environ.get("MAX_IMAGE_SIDE", 1600))
+IMAGE_CACHE_BYTES = int(os.environ.get("IMAGE_CACHE_BYTES", 32 * 1024 * 1024))
+
+# Uploads stay in memory up to this size, then spill to a temp file
+SPOOL_MEMORY_BYTES = 256 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class ImageTooLarge(ValueError):
+    """Raised as soon as an upload is known to exceed the configured limits"""
+
+
+class ImageCache:
+    """LRU cache of decoded images keyed by content hash, capped by decoded size"""
+
+    def __init__(self, max_bytes: int = IMAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[Image.Image, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest: str) -> Optional[Image.Image]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            self._entries.move_to_end(digest)
+            return entry[0]
+
+    def put(self, digest: str, image: Image.Image):
+        cost = image.width * image.height * len(image.getbands())
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+                return
+            self._entries[digest] = (image, cost)
+            self.current_bytes += cost
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_cost) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_cost
+
+    def __len__(self):
+        return len(self._entries)
+
+
+image_cache = ImageCache()
+
+
+class SpooledImage:
+    """An uploaded image held in a spooled temp buffer plus its SHA-256"""
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+        self._hasher = hashlib.sha256()
+        self.size = 0
+        self.digest = None
+
+    def write(self, data: bytes, max_bytes: int = MAX_IMAGE_BYTES):
+        self.size += len(data)
+        if self.size > max_bytes:
+            raise ImageTooLarge(f"Image exceeds the {max_bytes} byte limit")
+        self._hasher.update(data)
+        self.file.write(data)
+
+    def finish(self) -> "SpooledImage":
+        self.digest = self._hasher.hexdigest()
+        self.file.seek(0)
+        return self
+
+    def close(self):
+        self.file.close()
+
+
+def spool_base64(data: str, max_bytes: int = MAX_IMAGE_BYTES) -> SpooledImage:
+    """
+    Decode a base64 string into a spooled buffer piece by piece
+    Args:
+        data (str): Base64 image, optionally with a data: URL prefix
+        max_bytes (int): Maximum decoded size
+    Returns:
+        SpooledImage: Decoded image bytes, rewound and hashed
+    """
+    if data.startswith("data:"):
+        data = data.partition(",")[2]
+
+    # Reject before decoding anything when the encoded length already rules it out
+    if len(data) * 3 // 4 > max_bytes + 3:
+        raise ImageTooLarge(f"Image exceeds the {max_bytes} byte limit")
+
+    spooled = SpooledImage()
+    remainder = ""
+    for start in range(0, len(data), READ_CHUNK_SIZE):
+        piece = remainder + "".join(data[start:start + READ_CHUNK_SIZE].split())
+        usable = len(piece) - len(piece) % 4
+        if usable:
+            spooled.write(base64.b64decode(piece[:usable]), max_bytes)
+        remainder = piece[usable:]
+    if remainder:
+        spooled.write(base64.b64decode(remainder + "=" * (-len(remainder) % 4)), max_bytes)
+    return spooled.finish()
+
+
+class MultipartUpload:
+    """Form fields and the image part of a streamed multipart request"""
+
+    def __init__(self, max_image_bytes: int = MAX_IMAGE_BYTES):
+        self.fields: Dict[str, str] = {}
+        self.image: Optional[SpooledImage] = None
+        self.max_image_bytes = max_image_bytes
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._name = None
+        self._is_file = False
+        self._field_value = bytearray()
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        }
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._field_value = bytearray()
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = options.get(b"name", b"").decode("utf-8", "replace")
+        self._is_file = b"filename" in options
+        if self._is_file:
+            if self._name != "image" or self.image is not None:
+                raise ValueError(f"Unexpected file field: {self._name}")
+            self.image = SpooledImage()
+
+    def _on_part_data(self, data, start, end):
+        if self._is_file:
+            self.image.write(data[start:end], self.max_image_bytes)
+            return
+        self._field_value += data[start:end]
+        if len(self._field_value) > MAX_FIELD_BYTES:
+            raise ValueError(f"Form field {self._name} is too large")
+
+    def _on_part_end(self):
+        if self._is_file:
+            # Browsers send an empty file part when no file was chosen
+            if self.image.size == 0:
+                self.image.close()
+                self.image = None
+            else:
+                self.image.finish()
+        else:
+            self.fields[self._name] = self._field_value.decode("utf-8", "replace")
+
+    def close(self):
+        if self.image is not None:
+            self.image.close()
+
+
+async def read_multipart(request, max_image_bytes: int = MAX_IMAGE_BYTES) -> MultipartUpload:
+    """
+    Stream a multipart/form-data request body without buffering it whole
+    Args:
+        request: Starlette request with a multipart body
+        max_image_bytes (int): Maximum size of the image part
+    Returns:
+        MultipartUpload: Text fields and the spooled image, if one was sent
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise ValueError("Expected a multipart/form-data body")
+
+    # Refuse oversized bodies up front when the client declares their length
+    content_length = request.headers.get("content-length")
+    if content_length and int(content_length) > max_image_bytes + MAX_FIELD_BYTES:
+        raise ImageTooLarge(f"Request body exceeds the {max_image_bytes} byte image limit")
+
+    upload = MultipartUpload(max_image_bytes)
+    parser = MultipartParser(options[b"boundary"], upload.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    except Exception:
+        upload.close()
+        raise
+    return upload
+
+
+def load_image(spooled: SpooledImage, max_side: int = MAX_IMAGE_SIDE) -> Image.Image:
+    """
+    Decode a spooled image at reduced resolution, reusing cached decodes
+    Args:
+        spooled (SpooledImage): Image bytes with their content hash
+        max_side (int): Longest side of the returned image
+    Returns:
+        PIL.Image.Image: Decoded, downsampled RGB image
+    Raises:
+        ImageTooLarge: If the image has too many pixels
+        PIL.UnidentifiedImageError: If the bytes are not an image
+    """
+    cached = image_cache.get(spooled.digest)
+    if cached is not None:
+        return cached
+
+    spooled.file.seek(0)
+    try:
+        image = Image.open(spooled.file)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    # Image.open only reads the header, so this check costs no decode
+    if image.width * image.height > MAX_IMAGE_PIXELS:
+        raise ImageTooLarge(f"Image has more than {MAX_IMAGE_PIXELS} pixels")
+
+    # JPEG can decode straight to a smaller scale; other formats ignore this
+    image.draft("RGB", (max_side, max_side))
+    image.thumbnail((max_side, max_side))
+    image = image.convert("RGB")
+
+    image_cache.put(spooled.digest, image)
+    return image
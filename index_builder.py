@@ -0,0 +1,213 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_FILE = 'embeddings.npy'
+MANIFEST_FILE = 'manifest.json'
+SHARDS_DIR = 'shards'
+
+# Encoder of the current worker process, loaded once by _init_worker
+_encoder = None
+
+
+def load_documents(data):
+    """
+    Read crawled records from a JSONL file or a CorpusStore directory
+    Args:
+        data (str): JSONL path or store directory
+    Returns:
+        list: (doc id, record) pairs in corpus order
+    """
+    from corpus_store import CorpusStore
+
+    if CorpusStore.is_store(data):
+        return list(CorpusStore(data).items())
+    with open(data, 'r', encoding='utf-8') as f:
+        return [(i, json.loads(line)) for i, line in enumerate(f) if line.strip()]
+
+
+def fingerprint(chunks):
+    """Hash of the chunk texts in order, to check an index matches its corpus"""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def plan_shards(documents, num_shards):
+    """
+    Split documents into contiguous shards of roughly equal text size
+    Args:
+        documents (list): (doc id, record) pairs
+        num_shards (int): Number of shards wanted
+    Returns:
+        list: Lists of (doc id, record) pairs; concatenated they are the input
+    """
+    sizes = np.cumsum([len(doc['content']) for _, doc in documents])
+    total = sizes[-1] if len(sizes) else 0
+    bounds = [0]
+    for shard in range(1, num_shards):
+        # First document that starts past this shard's share of the text
+        bounds.append(max(bounds[-1], int(np.searchsorted(sizes, total * shard / num_shards))))
+    bounds.append(len(documents))
+    return [documents[start:end] for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _init_worker(threads):
+    """Limit math library threads, then load the encoder once per process"""
+    global _encoder
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    from encoders import load_encoder
+
+    _encoder = load_encoder(threads=threads)
+    if 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(threads)
+
+
+def _encode_shard(shard_no, documents, output_dir, batch_size):
+    """Chunk and embed one shard, writing its embedding and chunk files"""
+    from project1 import make_chunker, normalize_rows
+
+    start = time.perf_counter()
+    # Same CHUNKER settings as the server, so the fingerprints agree
+    chunker = make_chunker(encoder=_encoder)
+    chunks = []
+    doc_ids = []
+    for doc_id, doc in documents:
+        doc_chunks = chunker(doc['content'], doc.get('title', ''))
+        chunks.extend(doc_chunks)
+        doc_ids.extend([doc_id] * len(doc_chunks))
+
+    # Stored unit length so the server can map the index without copying it
+    embeddings = normalize_rows(np.asarray(_encoder.encode(chunks, batch_size=batch_size), dtype=np.float32))
+    name = os.path.join(output_dir, SHARDS_DIR, f"shard-{shard_no:05d}")
+    np.save(name + '.npy', embeddings)
+    with open(name + '.json', 'w', encoding='utf-8') as f:
+        json.dump({'doc_ids': doc_ids, 'chunks': chunks}, f)
+    return shard_no, len(chunks), time.perf_counter() - start
+
+
+def build_index(data, output_dir, workers=1, shards=None, threads=None, batch_size=32):
+    """
+    Build an embedding index with parallel worker processes
+    Args:
+        data (str): JSONL file or CorpusStore directory
+        output_dir (str): Directory for the merged index and per-shard files
+        workers (int): Worker processes
+        shards (int): Number of shards; defaults to the number of workers
+        threads (int): Math threads per worker; defaults to CPUs / workers
+        batch_size (int): Texts per encoder forward pass
+    Returns:
+        dict: The index manifest
+    """
+    start = time.perf_counter()
+    documents = load_documents(data)
+    shards = shards or workers
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    plan = plan_shards(documents, shards)
+    shards_dir = os.path.join(output_dir, SHARDS_DIR)
+    os.makedirs(shards_dir, exist_ok=True)
+    for name in os.listdir(shards_dir):
+        os.remove(os.path.join(shards_dir, name))
+
+    # Spawned workers start clean instead of inheriting the parent's thread pools
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(threads,)) as pool:
+        futures = [
+            pool.submit(_encode_shard, shard_no, shard, output_dir, batch_size)
+            for shard_no, shard in enumerate(plan)
+        ]
+        results = [future.result() for future in futures]
+    encoded = time.perf_counter()
+
+    manifest = merge_shards(output_dir, len(plan))
+    manifest.update({
+        'data': os.path.abspath(data),
+        'documents': len(documents),
+        'workers': workers,
+        'threads': threads,
+        'encode_seconds': encoded - start,
+        'total_seconds': time.perf_counter() - start
+    })
+    for shard_no, num_chunks, seconds in results:
+        manifest['shards'][shard_no]['seconds'] = seconds
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Built index of {manifest['chunks']} chunks in {manifest['total_seconds']:.1f}s")
+    return manifest
+
+
+def merge_shards(output_dir, num_shards):
+    """
+    Concatenate per-shard embeddings in shard order into one matrix
+    Args:
+        output_dir (str): Index directory
+        num_shards (int): Number of shard files
+    Returns:
+        dict: Manifest fields for the merged index
+    """
+    all_chunks = []
+    shards = []
+    arrays = []
+    rows = 0
+    for shard_no in range(num_shards):
+        name = os.path.join(output_dir, SHARDS_DIR, f"shard-{shard_no:05d}")
+        with open(name + '.json', 'r', encoding='utf-8') as f:
+            chunks = json.load(f)['chunks']
+        all_chunks.extend(chunks)
+        arrays.append(np.load(name + '.npy'))
+        shards.append({'file': os.path.basename(name), 'start': rows, 'end': rows + len(chunks)})
+        rows += len(chunks)
+
+    embeddings = np.concatenate(arrays) if arrays else np.zeros((0, 0), dtype=np.float32)
+    np.save(os.path.join(output_dir, EMBEDDINGS_FILE), embeddings)
+    return {'chunks': rows, 'fingerprint': fingerprint(all_chunks), 'shards': shards}
+
+
+def load_embeddings(index_dir, chunks):
+    """
+    Memory-map a built index if it was built from exactly these chunks
+    Args:
+        index_dir (str): Directory written by build_index()
+        chunks (list): Chunk texts of the corpus being served
+    Returns:
+        numpy.ndarray: Embeddings, or None if the index is missing or stale
+    """
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest['chunks'] != len(chunks) or manifest['fingerprint'] != fingerprint(chunks):
+        logger.warning(f"Index in {index_dir} does not match the corpus; re-encoding")
+        return None
+    return np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode='r')
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build the embedding index in parallel")
+    parser.add_argument("--data", default="tds_content.jsonl")
+    parser.add_argument("--output", default="index")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shards", type=int)
+    parser.add_argument("--threads", type=int)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    manifest = build_index(args.data, args.output, args.workers, args.shards, args.threads, args.batch_size)
+    print(f"{manifest['chunks']} chunks from {manifest['documents']} documents in "
+          f"{len(manifest['shards'])} shards, {manifest['total_seconds']:.1f}s")
@@ -0,0 +1,258 @@
+import os
+import time
+import threading
+import contextlib
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Metrics are off unless METRICS_ENABLED is set, so spans cost one
+# ContextVar lookup on the hot path when nobody is watching.
+_enabled = os.environ.get("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+
+# Latency buckets in seconds, from sub-millisecond scoring up to slow encodes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-request list of (stage, seconds), only set when a client asked for timings
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def is_enabled() -> bool:
+    """Return True if metrics collection is switched on"""
+    return _enabled
+
+
+def set_enabled(value: bool):
+    """Switch metrics collection on or off at runtime"""
+    global _enabled
+    _enabled = bool(value)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # label key -> [bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[Tuple[str, str], ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [0] * (len(self.buckets) + 1) + [0.0]
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(sorted(labels.items())))
+        return sum(series[:-1]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, series):
+                    cumulative += bucket_count
+                    labels = _format_labels(key, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                cumulative += series[len(self.buckets)]
+                labels = _format_labels(key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-1]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+_registry: Dict[str, object] = {}
+_registry_lock = threading.Lock()
+
+
+def counter(name: str, help_text: str) -> Counter:
+    """Get or create a counter in the global registry"""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Counter(name, help_text)
+        return _registry[name]
+
+
+def histogram(name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+    """Get or create a histogram in the global registry"""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Histogram(name, help_text, buckets)
+        return _registry[name]
+
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text format"""
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = histogram(
+    "qa_stage_duration_seconds", "Time spent in each stage of the answer path"
+)
+REQUEST_SECONDS = histogram(
+    "qa_request_duration_seconds", "End-to-end HTTP request latency"
+)
+REQUESTS_TOTAL = counter("qa_requests_total", "HTTP requests served")
+
+
+class _Span:
+    __slots__ = ("stage", "timings", "start")
+
+    def __init__(self, stage: str, timings):
+        self.stage = stage
+        self.timings = timings
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if _enabled:
+            STAGE_SECONDS.observe(elapsed, stage=self.stage)
+        if self.timings is not None:
+            self.timings.append((self.stage, elapsed))
+        return False
+
+
+_NOOP_SPAN = contextlib.nullcontext()
+
+
+def span(stage: str):
+    """
+    Time a stage of the answer path
+    Args:
+        stage (str): Stage name, e.g. "encode" or "score"
+    Returns:
+        A context manager; a shared no-op when nothing is recording
+    """
+    timings = _request_timings.get()
+    if not _enabled and timings is None:
+        return _NOOP_SPAN
+    return _Span(stage, timings)
+
+
+def begin_request(record_timings: bool):
+    """Start collecting per-request stage timings; returns (token, timings)"""
+    timings = [] if record_timings else None
+    return _request_timings.set(timings), timings
+
+
+def end_request(token):
+    """Stop collecting per-request stage timings"""
+    _request_timings.reset(token)
+
+
+def observe_request(endpoint: str, method: str, status: int, seconds: float):
+    """Record a finished HTTP request"""
+    if not _enabled:
+        return
+    REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+    REQUESTS_TOTAL.inc(endpoint=endpoint, method=method, status=str(status))
+
+
+def format_server_timing(timings: List[Tuple[str, float]], total: float) -> str:
+    """Format stage timings as a Server-Timing header value (milliseconds)"""
+    entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class TimingMiddleware:
+    """
+    Record request latency and, for clients sending X-Request-Timing: 1,
+    add a Server-Timing header with the stage durations
+
+    A plain ASGI middleware, so with metrics off and no timing header a
+    request passes straight through without being wrapped.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        want_timing = (b"x-request-timing", b"1") in scope["headers"]
+        if not want_timing and not _enabled:
+            await self.app(scope, receive, send)
+            return
+
+        token, timings = begin_request(want_timing)
+        start = time.perf_counter()
+
+        async def send_timed(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                # Label by endpoint function so unknown paths can't blow up cardinality
+                endpoint = scope.get("endpoint")
+                observe_request(
+                    endpoint.__name__ if endpoint else "unmatched",
+                    scope["method"],
+                    message["status"],
+                    elapsed
+                )
+                if timings is not None:
+                    header = format_server_timing(timings, elapsed).encode("latin-1")
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", header)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            end_request(token)
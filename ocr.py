@@ -0,0 +1,169 @@
+import os
+import sys
+import asyncio
+import logging
+import threading
+import functools
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from PIL import Image
+
+try:
+    import pytesseract
+except ImportError:  # OCR is optional; image questions then fall back to text only
+    pytesseract = None
+
+logger = logging.getLogger(__name__)
+
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", 2))
+OCR_TIMEOUT = float(os.environ.get("OCR_TIMEOUT", 3.0))
+OCR_MAX_PENDING = int(os.environ.get("OCR_MAX_PENDING", 8))
+OCR_CACHE_SIZE = int(os.environ.get("OCR_CACHE_SIZE", 256))
+# Longest OCR text merged into a query; error screenshots rarely need more
+MAX_OCR_CHARS = 1000
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending = 0
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def is_available() -> bool:
+    """Return True if pytesseract and the tesseract binary can be used"""
+    if pytesseract is None:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def _ocr_worker(mode: str, size, data: bytes) -> str:
+    """Run tesseract on raw pixels inside a worker process"""
+    image = Image.frombytes(mode, size, data)
+    try:
+        text = pytesseract.image_to_string(image)
+    except Exception as e:
+        # pytesseract's exceptions don't survive pickling back to the parent
+        raise RuntimeError(str(e))
+    return " ".join(text.split())
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn keeps workers free of the server's threads and model memory
+            _pool = ProcessPoolExecutor(
+                max_workers=OCR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown():
+    """Stop the OCR worker processes"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def get_cached(digest: str) -> Optional[str]:
+    """Return previously extracted text for an image hash"""
+    with _cache_lock:
+        text = _cache.get(digest)
+        if text is not None:
+            _cache.move_to_end(digest)
+        return text
+
+
+def _store(digest: str, text: str):
+    with _cache_lock:
+        _cache[digest] = text
+        _cache.move_to_end(digest)
+        while len(_cache) > OCR_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _on_done(digest: str, future):
+    global _pending
+    with _pool_lock:
+        _pending -= 1
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        logger.error(f"OCR failed for image {digest[:12]}: {future.exception()}")
+        return
+    _store(digest, future.result())
+
+
+async def extract_text(image: Image.Image, digest: str, timeout: float = OCR_TIMEOUT) -> str:
+    """
+    Extract text from an image in the OCR worker pool
+    Args:
+        image (PIL.Image.Image): Decoded image
+        digest (str): Content hash used as the cache key
+        timeout (float): Seconds to wait before answering without the text
+    Returns:
+        str: Extracted text, or an empty string if OCR is unavailable,
+            saturated or too slow
+    """
+    global _pending
+    cached = get_cached(digest)
+    if cached is not None:
+        return cached
+    if not is_available():
+        return ""
+
+    with _pool_lock:
+        if _pending >= OCR_MAX_PENDING:
+            logger.warning("OCR queue is full, answering without image text")
+            return ""
+        _pending += 1
+
+    # Grayscale is all tesseract needs and pickles at a third of the size
+    gray = image.convert("L")
+    try:
+        future = _get_pool().submit(_ocr_worker, gray.mode, gray.size, gray.tobytes())
+    except Exception as e:
+        with _pool_lock:
+            _pending -= 1
+        logger.error(f"Could not submit OCR job: {str(e)}")
+        return ""
+    future.add_done_callback(lambda f: _on_done(digest, f))
+
+    try:
+        # A timed-out job keeps running and fills the cache for the next request
+        text = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"OCR took longer than {timeout}s, answering without image text")
+        return ""
+    except Exception:
+        return ""
+    return text
+
+
+def merge_query(question: str, image_text: str) -> str:
+    """Append OCR text to the question so both feed the query embedding"""
+    if not image_text:
+        return question
+    return f"{question}\n\n{image_text[:MAX_OCR_CHARS]}"
+
+
+if __name__ == "__main__":
+    # Usage: python ocr.py image.png [image2.png ...]
+    if not is_available():
+        print("pytesseract or the tesseract binary is not installed")
+        sys.exit(1)
+    for path in sys.argv[1:]:
+        with Image.open(path) as img:
+            print(f"--- {path} ---")
+            print(_ocr_worker("L", img.size, img.convert("L").tobytes()))
@@ -0,0 +1,150 @@
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+
+# lxml is several times faster than the stdlib parser when it is installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Elements that start a new line in rendered text
+BLOCK_TAGS = {
+    'p', 'div', 'li', 'tr', 'pre', 'blockquote', 'section', 'article', 'aside',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'table', 'header', 'footer'
+}
+# Table cells on one row are separated like WebElement.text separates them
+CELL_TAGS = {'td', 'th'}
+HIDDEN_TAGS = {'script', 'style', 'template', 'noscript'}
+
+_BREAK = object()
+
+
+def _soup(html):
+    return BeautifulSoup(html, HTML_PARSER)
+
+
+def _render(element, pieces):
+    """Append an element's text to pieces: strings, _BREAK, or ('pre', text)"""
+    for child in element.children:
+        if isinstance(child, Comment):
+            continue
+        if isinstance(child, NavigableString):
+            pieces.append(str(child))
+        elif isinstance(child, Tag):
+            if child.name in HIDDEN_TAGS:
+                continue
+            if child.name == 'br':
+                pieces.append(_BREAK)
+            elif child.name == 'pre':
+                # Code keeps its indentation and blank lines
+                pieces.append(('pre', child.get_text()))
+            elif child.name in BLOCK_TAGS:
+                pieces.append(_BREAK)
+                _render(child, pieces)
+                pieces.append(_BREAK)
+            else:
+                _render(child, pieces)
+                if child.name in CELL_TAGS:
+                    pieces.append(' ')
+
+
+def _text(element):
+    """Visible text of an element, one line per block, like WebElement.text"""
+    if element is None:
+        return ''
+    pieces = []
+    _render(element, pieces)
+
+    lines = []
+    current = []
+
+    def flush():
+        line = ' '.join(''.join(current).split())
+        if line:
+            lines.append(line)
+        current.clear()
+
+    for piece in pieces:
+        if piece is _BREAK:
+            flush()
+        elif isinstance(piece, tuple):
+            flush()
+            lines.extend(piece[1].strip('\n').split('\n'))
+        else:
+            current.append(piece)
+    flush()
+    return '\n'.join(lines)
+
+
+def _title(soup):
+    return soup.title.get_text(strip=True) if soup.title else None
+
+
+def parse_links(html, base_url, container_class):
+    """
+    Extract link targets from a page snapshot
+    Args:
+        html (str): Rendered page source
+        base_url (str): URL the snapshot was taken at, for relative links
+        container_class (str): Class of the element holding the links
+    Returns:
+        list: Absolute URLs in document order
+    """
+    container = _soup(html).find(class_=container_class)
+    if container is None:
+        return []
+    return [urljoin(base_url, a['href']) for a in container.find_all('a', href=True)]
+
+
+def parse_course_page(html):
+    """
+    Extract a course page's title and main content
+    Args:
+        html (str): Rendered page source
+    Returns:
+        dict: title and content
+    """
+    soup = _soup(html)
+    return {
+        'title': _title(soup),
+        'content': _text(soup.find(class_='content'))
+    }
+
+
+def parse_topic_list(html, base_url):
+    """
+    Extract topics from a Discourse category page
+    Args:
+        html (str): Rendered page source
+        base_url (str): URL the snapshot was taken at, for relative links
+    Returns:
+        list: (topic URL, last posting date text) pairs
+    """
+    topics = []
+    for row in _soup(html).find_all(class_='topic-list-item'):
+        title = row.find(class_='title')
+        link = title.find('a', href=True) if title is not None else None
+        date = row.find(class_='last-posting-date')
+        if link is None or date is None:
+            continue
+        topics.append((urljoin(base_url, link['href']), _text(date)))
+    return topics
+
+
+def parse_topic_page(html):
+    """
+    Extract a Discourse topic's title and post bodies
+    Args:
+        html (str): Rendered page source
+    Returns:
+        dict: title and the list of post texts
+    """
+    soup = _soup(html)
+    posts = []
+    for post in soup.find_all(class_='topic-post'):
+        body = post.find(class_='post-content')
+        if body is not None:
+            posts.append(_text(body))
+    return {'title': _title(soup), 'posts': posts}
@@ -0,0 +1,124 @@
+import io
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+
+_enabled = os.environ.get("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+
+MAX_PROFILE_SECONDS = float(os.environ.get("MAX_PROFILE_SECONDS", 60))
+
+# Only one sampling session at a time; they would skew each other
+_sampling_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Raised when a sampling session is already running"""
+
+
+def is_enabled() -> bool:
+    """Return True if the profiling endpoints are switched on"""
+    return _enabled
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame) -> tuple:
+    """Function names from the outermost call to frame"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return tuple(reversed(names))
+
+
+def sample_cpu(seconds: float, interval: float = 0.005, memory: bool = False, top: int = 25) -> dict:
+    """
+    Sample the stacks of every thread in this process for a while
+    Args:
+        seconds (float): How long to sample, capped at MAX_PROFILE_SECONDS
+        interval (float): Seconds between samples
+        memory (bool): Also trace allocations and report the largest sites
+        top (int): Number of functions and allocation sites to report
+    Returns:
+        dict: Sample count, busiest functions by self and total samples,
+            collapsed stacks (flame graph input) and optional memory report
+    Raises:
+        ProfilerBusy: If another session is running
+    """
+    if not _sampling_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being captured")
+    try:
+        seconds = min(seconds, MAX_PROFILE_SECONDS)
+        started_tracing = memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+
+        own_thread = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_thread:
+                    stacks[_stack(frame)] += 1
+            samples += 1
+            time.sleep(interval)
+        duration = time.perf_counter() - start
+
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in stacks.items():
+            self_counts[stack[-1]] += count
+            for name in set(stack):
+                total_counts[name] += count
+
+        report = {
+            "seconds": round(duration, 3),
+            "samples": samples,
+            "interval": interval,
+            "self": self_counts.most_common(top),
+            "total": total_counts.most_common(top),
+            "collapsed": [f"{';'.join(stack)} {count}" for stack, count in stacks.most_common()]
+        }
+
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            report["memory"] = {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top": [
+                    {"site": str(stat.traceback), "bytes": stat.size, "blocks": stat.count}
+                    for stat in snapshot.statistics("lineno")[:top]
+                ]
+            }
+        return report
+    finally:
+        _sampling_lock.release()
+
+
+def profile_call(func, *args, top: int = 25, **kwargs):
+    """
+    Run a function under cProfile
+    Args:
+        func: Function to call with the remaining arguments
+        top (int): Number of functions in the summary
+    Returns:
+        tuple: (the function's result, pstats summary sorted by cumulative time)
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(top)
+    return result, output.getvalue()
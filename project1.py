@@ -1,39 +1,390 @@
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import textwrap
 import json
+import os
 import re
+import math
+import functools
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+import metrics
+from corpus_store import CorpusStore
+from encoders import load_encoder
+
+NO_ANSWER = {
+    'answer': 'I could not find a relevant answer to your question.',
+    'similarity': 0.0,
+    'context': '',
+    'source_url': '',
+    'source_title': ''
+}
+
+def _to_datetime64(value):
+    """Convert an ISO timestamp string, date or datetime to datetime64[s] (NaT if missing)"""
+    if not value:
+        return np.datetime64('NaT', 's')
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return np.datetime64('NaT', 's')
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return np.datetime64(value, 's')
+
+# Rows selected by a filter above which scoring every row and then picking
+# the candidates is cheaper than gathering the candidate rows first
+FULL_SCAN_FRACTION = 0.5
+
+def normalize_rows(matrix):
+    """
+    L2-normalise embedding rows so a dot product is the cosine similarity
+    Args:
+        matrix (numpy.ndarray): Embeddings, possibly memory-mapped
+    Returns:
+        numpy.ndarray: The matrix itself if its rows are already unit length
+            (so a memory-mapped index stays mapped), else a float32 copy
+    """
+    if len(matrix) == 0:
+        return matrix
+    norms = np.linalg.norm(matrix, axis=1)
+    if matrix.dtype == np.float32 and np.allclose(norms, 1.0, atol=1e-4):
+        return matrix
+    return (np.asarray(matrix, dtype=np.float32) / np.clip(norms, 1e-12, None)[:, None]).astype(np.float32)
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+def create_chunks(text, title='', max_length=150):
+    """
+    Split text into meaningful chunks while preserving context
+    Args:
+        text (str): Text to split
+        title (str): Document title for context
+        max_length (int): Maximum chunk length
+    Returns:
+        list: List of text chunks
+    """
+    chunks = []
+    
+    # Add title as context if available
+    context = f"{title}\n\n" if title else ""
+    
+    # First, try to split by headers
+    header_pattern = r'(?m)^\s*(#{1,6}|\d+\.)\s+(.+)$'
+    sections = []
+    last_end = 0
+    
+    for match in re.finditer(header_pattern, text):
+        if last_end < match.start():
+            # Add text before this header
+            sections.append(text[last_end:match.start()].strip())
+        # Add header and following text
+        sections.append(text[match.start():match.end()].strip())
+        last_end = match.end()
+    
+    # Add remaining text
+    if last_end < len(text):
+        sections.append(text[last_end:].strip())
+    
+    for section in sections:
+        if not section:
+            continue
+            
+        # Split section into paragraphs
+        paragraphs = [p.strip() for p in section.split('\n\n') if p.strip()]
+        
+        current_chunk = ""
+        for para in paragraphs:
+            # Special handling for code blocks
+            if '```' in para or any(line.strip().startswith(('    ', '\t')) for line in para.split('\n')):
+                # If we have accumulated text, save it as a chunk
+                if current_chunk:
+                    chunks.append(context + current_chunk.strip())
+                    current_chunk = ""
+                # Save code block as its own chunk
+                chunks.append(context + para.strip())
+                continue
+            
+            # Special handling for lists
+            if any(line.strip().startswith(('•', '-', '*', '1.')) for line in para.split('\n')):
+                # If we have accumulated text, save it as a chunk
+                if current_chunk:
+                    chunks.append(context + current_chunk.strip())
+                    current_chunk = ""
+                # Save list as its own chunk
+                chunks.append(context + para.strip())
+                continue
+            
+            # For regular paragraphs
+            if len(current_chunk) + len(para) <= max_length:
+                current_chunk += " " + para
+            else:
+                if current_chunk:
+                    chunks.append(context + current_chunk.strip())
+                current_chunk = para
+        
+        if current_chunk:
+            chunks.append(context + current_chunk.strip())
+    
+    return chunks
+
+def _split_to_budget(unit, count_tokens, budget, overlap):
+    """Split an over-long paragraph by lines, and over-long lines by words, into overlapping pieces within budget"""
+    joiner = '\n' if '\n' in unit else ' '
+    pieces = []
+    current = []
+    current_size = 0
+    for part in unit.split(joiner):
+        size = count_tokens(part)
+        if size > budget and joiner == '\n':
+            pieces.extend(_split_to_budget(part, count_tokens, budget, overlap))
+            continue
+        # Whitespace never joins tokens, so part counts add up
+        if current and current_size + size > budget:
+            pieces.append(joiner.join(p for p, _ in current))
+            carried = []
+            for previous in reversed(current):
+                if sum(n for _, n in carried) + previous[1] > min(overlap, budget - size):
+                    break
+                carried.insert(0, previous)
+            current = carried
+            current_size = sum(n for _, n in carried)
+        current.append((part, size))
+        current_size += size
+    if current:
+        pieces.append(joiner.join(p for p, _ in current))
+    return pieces
+
+def create_token_chunks(text, title='', count_tokens=None, target_tokens=200, overlap_tokens=32):
+    """
+    Split text into chunks sized by model tokens rather than characters
+    Args:
+        text (str): Text to split
+        title (str): Document title, prefixed to every chunk and counted
+            against its budget
+        count_tokens: Function returning the token count of a string
+        target_tokens (int): Maximum tokens per chunk, title included
+        overlap_tokens (int): Tokens of trailing paragraphs (or words, for a
+            split paragraph) repeated at the start of the next chunk
+    Returns:
+        list: List of text chunks
+    """
+    count_tokens = count_tokens or (lambda s: len(TOKEN_PATTERN.findall(s)))
+    context = f"{title}\n\n" if title else ""
+    budget = max(target_tokens - count_tokens(context), 16)
+    # Markdown headings only: numbered list items are packed like other lists
+    header_pattern = re.compile(r'^\s*#{1,6}\s+\S')
+    
+    # Paragraphs, lists and code blocks are all units that are packed
+    # together; only units longer than the budget are split
+    units = []
+    for para in (p.strip() for p in text.split('\n\n')):
+        if not para:
+            continue
+        size = count_tokens(para)
+        if size <= budget:
+            units.append((para, size))
+        else:
+            pieces = _split_to_budget(para, count_tokens, budget, overlap_tokens)
+            units.extend((piece, count_tokens(piece)) for piece in pieces)
+    
+    chunks = []
+    current = []
+    current_size = 0
+    for unit, size in units:
+        # A header starts a new chunk so a section is not split from its title
+        starts_section = header_pattern.match(unit.split('\n', 1)[0]) is not None
+        # A lone header stays with the text after it, even if that runs
+        # over the budget by the header's length
+        lone_header = len(current) == 1 and header_pattern.match(current[0][0]) is not None
+        if current and (current_size + size > budget or starts_section) and not lone_header:
+            chunks.append(context + '\n\n'.join(u for u, _ in current))
+            # Carry whole trailing paragraphs into the next chunk as overlap
+            carried = []
+            carried_size = 0
+            if not starts_section:
+                for previous, previous_size in reversed(current):
+                    if carried_size + previous_size > overlap_tokens or carried_size + previous_size + size > budget:
+                        break
+                    carried.insert(0, (previous, previous_size))
+                    carried_size += previous_size
+            current, current_size = carried, carried_size
+        current.append((unit, size))
+        current_size += size
+    if current:
+        chunks.append(context + '\n\n'.join(u for u, _ in current))
+    return chunks
+
+def make_chunker(mode=None, encoder=None, target_tokens=None, overlap_tokens=None):
+    """
+    Create the chunking function selected by arguments or environment
+    Args:
+        mode (str): "chars" (create_chunks) or "tokens" (create_token_chunks);
+            falls back to CHUNKER, default "chars"
+        encoder: Encoder whose tokenizer counts tokens
+        target_tokens (int): Falls back to CHUNK_TARGET_TOKENS, default 200
+        overlap_tokens (int): Falls back to CHUNK_OVERLAP_TOKENS, default 32
+    Returns:
+        Function (text, title) -> list of chunk texts
+    """
+    mode = mode or os.environ.get("CHUNKER", "chars")
+    if mode == "chars":
+        return create_chunks
+    if mode == "tokens":
+        count_tokens = getattr(encoder, 'count_tokens', None)
+        target_tokens = target_tokens or int(os.environ.get("CHUNK_TARGET_TOKENS", 200))
+        if overlap_tokens is None:
+            overlap_tokens = int(os.environ.get("CHUNK_OVERLAP_TOKENS", 32))
+        return functools.partial(
+            create_token_chunks,
+            count_tokens=count_tokens,
+            target_tokens=target_tokens,
+            overlap_tokens=overlap_tokens
+        )
+    raise ValueError(f"Unknown chunker: {mode}")
+
+class StoredChunks:
+    """Chunk texts re-created on demand from documents in a CorpusStore"""
+    
+    def __init__(self, store, doc_ids, positions, chunker, cache_docs=256):
+        """
+        Args:
+            store (CorpusStore): Store holding the source documents
+            doc_ids (numpy.ndarray): Doc id of each chunk
+            positions (numpy.ndarray): Position of each chunk within its document
+            chunker: Function (content, title) -> list of chunk texts
+            cache_docs (int): Chunked documents kept in memory
+        """
+        self.store = store
+        self.doc_ids = doc_ids
+        self.positions = positions
+        self._chunker = chunker
+        self._cache_docs = cache_docs
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _doc_chunks(self, doc_id):
+        with self._lock:
+            chunks = self._cache.get(doc_id)
+            if chunks is not None:
+                self._cache.move_to_end(doc_id)
+                return chunks
+        doc = self.store.get(doc_id)
+        chunks = self._chunker(doc['content'], doc.get('title', ''))
+        with self._lock:
+            self._cache[doc_id] = chunks
+            while len(self._cache) > self._cache_docs:
+                self._cache.popitem(last=False)
+        return chunks
+    
+    def __len__(self):
+        return len(self.doc_ids)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._doc_chunks(int(self.doc_ids[index]))[self.positions[index]]
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
 
 class QASystem:
-    def __init__(self, jsonl_file):
+    def __init__(self, jsonl_file, reranker=None, encoder=None, index_dir=None, shards=0,
+                 chunker=None):
         """
         Initialize the QA system with crawled content
         Args:
-            jsonl_file (str): Path to the JSONL file containing crawled content
+            jsonl_file (str): Path to the JSONL file containing crawled content,
+                or a CorpusStore directory; chunk texts from a store are read
+                back from disk on demand instead of kept in memory
+            reranker (CrossEncoderReranker): Optional second retrieval stage
+            encoder: Embedding backend from encoders.load_encoder(); defaults
+                to the one selected by ENCODER_BACKEND
+            index_dir (str): Index built by index_builder.py; used instead of
+                encoding the chunks when it matches them
+            shards (int): Split the embeddings across this many search worker
+                processes (see shard_search.py); 0 searches in this process.
+                With shards, self.embeddings is None and num_rows gives its size
+            chunker (str): "chars" or "tokens"; defaults to CHUNKER
         """
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.model = encoder or load_encoder()
+        self._chunker = make_chunker(chunker, self.model)
+        self.reranker = reranker
         
         # Load and process crawled content
-        self.documents = self._load_documents(jsonl_file)
+        self.store = CorpusStore(jsonl_file) if CorpusStore.is_store(jsonl_file) else None
+        if self.store is not None:
+            self.documents = None
+            documents = self.store.items()
+        else:
+            self.documents = self._load_documents(jsonl_file)
+            documents = enumerate(self.documents)
         
         # Create chunks from all documents
         self.chunks = []
         self.chunk_metadata = []  # Store source info for each chunk
+        chunk_sources = []
+        chunk_timestamps = []
+        chunk_doc_ids = []
+        chunk_positions = []
         
-        for doc in self.documents:
+        for doc_id, doc in documents:
             doc_chunks = self._create_chunks(doc['content'], doc.get('title', ''))
             self.chunks.extend(doc_chunks)
+            chunk_doc_ids.extend([doc_id] * len(doc_chunks))
+            chunk_positions.extend(range(len(doc_chunks)))
             
             # Store metadata for each chunk
+            timestamp = _to_datetime64(doc.get('timestamp'))
             for _ in doc_chunks:
                 self.chunk_metadata.append({
                     'url': doc['url'],
                     'title': doc['title']
                 })
+                chunk_sources.append(doc.get('source', ''))
+                chunk_timestamps.append(timestamp)
+        
+        # Filterable metadata as columns aligned with the embedding rows:
+        # sources as small integer codes, timestamps as datetime64 (NaT if unknown)
+        self.source_names = sorted(set(chunk_sources))
+        codes = {name: code for code, name in enumerate(self.source_names)}
+        self.chunk_source = np.array([codes[name] for name in chunk_sources], dtype=np.int16)
+        self.chunk_timestamp = np.array(chunk_timestamps, dtype='datetime64[s]')
+        self._mask_cache = {}
+        
+        # Create embeddings for all chunks, unless a prebuilt index matches
+        self.embeddings = None
+        if index_dir is not None:
+            from index_builder import load_embeddings
+            self.embeddings = load_embeddings(index_dir, self.chunks)
+        if self.embeddings is None:
+            self.embeddings = self.model.encode(self.chunks)
+        # Normalised once here so search() scores with a plain dot product
+        self.embeddings = normalize_rows(self.embeddings)
+        self.num_rows = len(self.embeddings)
+        self._build_lexical_index()
         
-        # Create embeddings for all chunks
-        self.embeddings = self.model.encode(self.chunks)
+        self.shard_index = None
+        if shards:
+            from shard_search import ShardedIndex
+            # Workers map a prebuilt index file themselves; otherwise they
+            # are sent their slice of the in-memory matrix
+            source = getattr(self.embeddings, 'filename', None) or self.embeddings
+            self.shard_index = ShardedIndex(source, self.num_rows, shards)
+            # The workers hold the rows now, so this process drops its copy
+            self.embeddings = None
+        
+        if self.store is not None:
+            # Texts were only needed to build the index; drop them and read
+            # the few that answers need back from the store
+            self.chunks = StoredChunks(
+                self.store,
+                np.array(chunk_doc_ids, dtype=np.int64),
+                np.array(chunk_positions, dtype=np.int32),
+                self._create_chunks
+            )
     
     def _load_documents(self, jsonl_file):
         """Load documents from JSONL file"""
@@ -43,130 +394,240 @@ class QASystem:
                 documents.append(json.loads(line))
         return documents
     
-    def _create_chunks(self, text, title='', max_length=150):
+    def _create_chunks(self, text, title=''):
+        """Split text into chunks with the configured chunker"""
+        return self._chunker(text, title)
+    
+    def _build_lexical_index(self):
+        """Build token postings and IDF weights for model-free lexical search"""
+        postings = defaultdict(list)
+        for idx, chunk in enumerate(self.chunks):
+            for token in set(TOKEN_PATTERN.findall(chunk.lower())):
+                postings[token].append(idx)
+        
+        total = len(self.chunks)
+        self.lexical_postings = {
+            token: np.array(ids, dtype=np.int32) for token, ids in postings.items()
+        }
+        self.lexical_idf = {
+            token: math.log(1 + total / len(ids)) for token, ids in postings.items()
+        }
+    
+    def lexical_search(self, question, top_k=3, source=None, start=None, end=None):
+        """
+        Rank chunks by IDF-weighted keyword overlap, without running the model
+        Args:
+            question (str): The user's question
+            top_k (int): Number of top chunks to return
+            source, start, end: Metadata filters as in search()
+        Returns:
+            list: (chunk index, score in [0, 1]) pairs, best first
+        """
+        tokens = set(TOKEN_PATTERN.findall(question.lower()))
+        weights = [(self.lexical_postings[t], self.lexical_idf[t]) for t in tokens if t in self.lexical_postings]
+        if not weights:
+            return []
+        
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for ids, idf in weights:
+            scores[ids] += idf
+        # Scale by the best possible score so values read like similarities
+        scores /= sum(idf for _, idf in weights)
+        
+        candidates = self.filter_indices(source, start, end)
+        if candidates is not None:
+            filtered = np.zeros_like(scores)
+            filtered[candidates] = scores[candidates]
+            scores = filtered
+        
+        top_indices = np.argsort(-scores, kind='stable')[:top_k]
+        return [(int(idx), float(scores[idx])) for idx in top_indices if scores[idx] > 0]
+    
+    def filter_indices(self, source=None, start=None, end=None):
         """
-        Split text into meaningful chunks while preserving context
+        Find the chunks matching metadata filters
         Args:
-            text (str): Text to split
-            title (str): Document title for context
-            max_length (int): Maximum chunk length
+            source (str or list): Allowed source(s), e.g. "forum"
+            start (date or datetime): Earliest timestamp, inclusive
+            end (date or datetime): Latest timestamp; a date includes the whole day
         Returns:
-            list: List of text chunks
+            numpy.ndarray: Matching chunk indices, or None when unfiltered
         """
-        chunks = []
+        if source is None and start is None and end is None:
+            return None
         
-        # Add title as context if available
-        context = f"{title}\n\n" if title else ""
+        sources = (source,) if isinstance(source, str) else tuple(source or ())
+        key = (sources, start, end)
+        # One lookup: another thread may clear the cache between two
+        cached = self._mask_cache.get(key)
+        if cached is not None:
+            return cached
         
-        # First, try to split by headers
-        header_pattern = r'(?m)^\s*(#{1,6}|\d+\.)\s+(.+)$'
-        sections = []
-        last_end = 0
+        mask = np.ones(len(self.chunks), dtype=bool)
+        if sources:
+            codes = [self.source_names.index(name) for name in sources if name in self.source_names]
+            mask &= np.isin(self.chunk_source, codes)
+        if start is not None:
+            mask &= self.chunk_timestamp >= _to_datetime64(start)
+        if end is not None:
+            if not isinstance(end, datetime):
+                end = datetime.combine(end, datetime.min.time()) + timedelta(days=1)
+                mask &= self.chunk_timestamp < _to_datetime64(end)
+            else:
+                mask &= self.chunk_timestamp <= _to_datetime64(end)
         
-        for match in re.finditer(header_pattern, text):
-            if last_end < match.start():
-                # Add text before this header
-                sections.append(text[last_end:match.start()].strip())
-            # Add header and following text
-            sections.append(text[match.start():match.end()].strip())
-            last_end = match.end()
+        indices = np.flatnonzero(mask)
+        if len(self._mask_cache) >= 64:
+            self._mask_cache.clear()
+        self._mask_cache[key] = indices
+        return indices
+    
+    def search(self, question, top_k=3, threshold=0.2, source=None, start=None, end=None):
+        """
+        Rank chunks for a question without assembling answers
+        Args:
+            question (str): The user's question
+            top_k (int): Number of top chunks to return
+            threshold (float): Minimum similarity score threshold
+            source (str or list): Only search chunks from these sources
+            start (date or datetime): Only search chunks on or after this time
+            end (date or datetime): Only search chunks on or before this time
+        Returns:
+            list: (chunk index, similarity) pairs, best first
+        """
+        hits = self.first_stage(question, top_k, threshold, source, start, end)
+        return self.rerank(question, hits, top_k)
+    
+    def first_stage(self, question, top_k=3, threshold=0.2, source=None, start=None, end=None):
+        """
+        Rank chunks by embedding similarity alone
+        With a re-ranker, returns its whole shortlist for rerank() to re-score
+        Args:
+            question (str): The user's question
+            top_k (int): Number of top chunks to return
+            threshold (float): Minimum similarity score threshold
+            source (str or list): Only search chunks from these sources
+            start (date or datetime): Only search chunks on or after this time
+            end (date or datetime): Only search chunks on or before this time
+        Returns:
+            list: (chunk index, similarity) pairs, best first
+        """
+        # Apply metadata filters first so only matching rows are scored
+        candidates = self.filter_indices(source, start, end)
+        if candidates is not None and len(candidates) == 0:
+            return []
         
-        # Add remaining text
-        if last_end < len(text):
-            sections.append(text[last_end:].strip())
+        # Get embedding for the question
+        with metrics.span("encode"):
+            question_embedding = self.model.encode([question])
         
-        for section in sections:
-            if not section:
-                continue
-                
-            # Split section into paragraphs
-            paragraphs = [p.strip() for p in section.split('\n\n') if p.strip()]
-            
-            current_chunk = ""
-            for para in paragraphs:
-                # Special handling for code blocks
-                if '```' in para or any(line.strip().startswith(('    ', '\t')) for line in para.split('\n')):
-                    # If we have accumulated text, save it as a chunk
-                    if current_chunk:
-                        chunks.append(context + current_chunk.strip())
-                        current_chunk = ""
-                    # Save code block as its own chunk
-                    chunks.append(context + para.strip())
-                    continue
-                
-                # Special handling for lists
-                if any(line.strip().startswith(('•', '-', '*', '1.')) for line in para.split('\n')):
-                    # If we have accumulated text, save it as a chunk
-                    if current_chunk:
-                        chunks.append(context + current_chunk.strip())
-                        current_chunk = ""
-                    # Save list as its own chunk
-                    chunks.append(context + para.strip())
-                    continue
-                
-                # For regular paragraphs
-                if len(current_chunk) + len(para) <= max_length:
-                    current_chunk += " " + para
+        # Get indices of top k most similar chunks above threshold; with a
+        # re-ranker, keep a larger shortlist for it to re-score
+        limit = max(top_k, self.reranker.shortlist) if self.reranker else top_k
+        
+        if self.shard_index is not None:
+            # Each shard scores and selects its own rows; the best are merged
+            with metrics.span("score"):
+                hits = self.shard_index.search(question_embedding[0], limit, threshold, candidates)
+        else:
+            # Rows are unit length, so cosine similarity is a dot product
+            query = np.asarray(question_embedding[0], dtype=np.float32)
+            query = query / max(np.linalg.norm(query), 1e-12)
+            with metrics.span("score"):
+                if candidates is None:
+                    similarities = self.embeddings @ query
+                elif len(candidates) > FULL_SCAN_FRACTION * self.num_rows:
+                    similarities = (self.embeddings @ query)[candidates]
                 else:
-                    if current_chunk:
-                        chunks.append(context + current_chunk.strip())
-                    current_chunk = para
+                    similarities = self.embeddings[candidates] @ query
             
-            if current_chunk:
-                chunks.append(context + current_chunk.strip())
-        
-        return chunks
+            with metrics.span("select"):
+                top_indices = []
+                for idx in np.argsort(similarities)[::-1]:
+                    if similarities[idx] >= threshold:
+                        top_indices.append(idx)
+                    if len(top_indices) >= limit:
+                        break
+            
+            if candidates is None:
+                hits = [(int(idx), float(similarities[idx])) for idx in top_indices]
+            else:
+                hits = [(int(candidates[idx]), float(similarities[idx])) for idx in top_indices]
+        return hits
+    
+    def will_rerank(self, hits):
+        """Whether rerank() would re-score these first-stage hits"""
+        return self.reranker is not None and len(hits) > 1
+    
+    def rerank(self, question, hits, top_k=3):
+        """
+        Re-score first-stage hits with the re-ranker, if one is configured
+        Args:
+            question (str): The user's question
+            hits (list): (chunk index, similarity) pairs from first_stage()
+            top_k (int): Number of hits to return
+        Returns:
+            list: (chunk index, similarity) pairs, best first
+        """
+        if not self.will_rerank(hits):
+            return hits[:top_k]
+        with metrics.span("rerank"):
+            return self.reranker.rerank(question, hits, self.chunks, top_k)
     
-    def get_answer(self, question, top_k=3, threshold=0.2):
+    def answer_dict(self, index, similarity, include_context=True):
+        """
+        Build the answer dictionary for a ranked chunk
+        Args:
+            index (int): Index of the answer chunk
+            similarity (float): Similarity score of the chunk
+            include_context (bool): Assemble surrounding context
+        Returns:
+            dict: Answer text, score, context and source metadata
+        """
+        return {
+            'answer': self.chunks[index],
+            'similarity': similarity,
+            'context': self.get_context(index) if include_context else '',
+            'source_url': self.chunk_metadata[index]['url'],
+            'source_title': self.chunk_metadata[index]['title']
+        }
+    
+    def get_answer(self, question, top_k=3, threshold=0.2, include_context=True,
+                   source=None, start=None, end=None, lexical=False):
         """
         Get the most relevant answers for a given question
         Args:
             question (str): The user's question
             top_k (int): Number of top answers to return
             threshold (float): Minimum similarity score threshold
+            include_context (bool): Assemble surrounding context for each answer
+            source (str or list): Only answer from these sources
+            start (date or datetime): Only answer from chunks on or after this time
+            end (date or datetime): Only answer from chunks on or before this time
+            lexical (bool): Use keyword-only lexical_search instead of embeddings
         Returns:
             list: List of dictionaries containing answers and their metadata
         """
-        # Get embedding for the question
-        question_embedding = self.model.encode([question])
-        
-        # Calculate similarity scores
-        similarities = cosine_similarity(question_embedding, self.embeddings)[0]
-        
-        # Get indices of top k most similar chunks above threshold
-        top_indices = []
-        for idx in np.argsort(similarities)[::-1]:
-            if similarities[idx] >= threshold:
-                top_indices.append(idx)
-            if len(top_indices) >= top_k:
-                break
-        
-        if not top_indices:
-            return [{
-                'answer': 'I could not find a relevant answer to your question.',
-                'similarity': 0.0,
-                'context': '',
-                'source_url': '',
-                'source_title': ''
-            }]
+        if lexical:
+            hits = self.lexical_search(question, top_k, source=source, start=start, end=end)
+        else:
+            hits = self.search(question, top_k, threshold, source=source, start=start, end=end)
         
-        # Return top k answers with their similarity scores and metadata
-        answers = []
-        for idx in top_indices:
-            # Get surrounding context
-            context = self._get_context(idx)
-            
-            answers.append({
-                'answer': self.chunks[idx],
-                'similarity': float(similarities[idx]),
-                'context': context,
-                'source_url': self.chunk_metadata[idx]['url'],
-                'source_title': self.chunk_metadata[idx]['title']
-            })
+        if not hits:
+            return [NO_ANSWER.copy()]
         
-        return answers
+        # Return top k answers with their similarity scores and metadata
+        with metrics.span("context"):
+            return [self.answer_dict(idx, similarity, include_context) for idx, similarity in hits]
+    
+    def close(self):
+        """Stop search worker processes and close the corpus store, if any"""
+        if self.shard_index is not None:
+            self.shard_index.close()
+        if self.store is not None:
+            self.store.close()
     
-    def _get_context(self, index, window=1):
+    def get_context(self, index, window=1):
         """
         Get surrounding context for an answer
         Args:
@@ -0,0 +1,97 @@
+import time
+import logging
+
+import numpy as np
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANKER_MODEL = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+
+RERANK_FALLBACKS = metrics.counter(
+    "qa_rerank_fallbacks_total", "Re-rank requests answered in first-stage order"
+)
+
+
+class CrossEncoderReranker:
+    """Second retrieval stage that re-scores a shortlist with a cross-encoder"""
+
+    def __init__(self, model_name=DEFAULT_RERANKER_MODEL, shortlist=50, budget_ms=150.0,
+                 probe_every=20):
+        """
+        Load the cross-encoder and warm it up
+        Args:
+            model_name (str): sentence-transformers CrossEncoder model
+            shortlist (int): Number of first-stage hits to re-score
+            budget_ms (float): Per-request re-rank latency budget
+            probe_every (int): After this many budget fallbacks in a row,
+                score a minimal batch anyway to refresh the speed estimate
+        """
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name)
+        self.shortlist = shortlist
+        self.budget = budget_ms / 1000
+        self.probe_every = probe_every
+        # Moving average of seconds per scored pair, used to size the shortlist;
+        # None until a real request has been scored
+        self._seconds_per_pair = None
+        self._fallbacks_in_a_row = 0
+        # The first call pays one-off setup costs, so it must not seed the estimate
+        self.model.predict([("warm up", "warm up")], show_progress_bar=False)
+
+    def _score(self, pairs):
+        """Score all pairs in a single batched forward pass"""
+        start = time.perf_counter()
+        scores = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        per_pair = (time.perf_counter() - start) / len(pairs)
+        if self._seconds_per_pair is None:
+            self._seconds_per_pair = per_pair
+        else:
+            self._seconds_per_pair = 0.8 * self._seconds_per_pair + 0.2 * per_pair
+        return np.asarray(scores)
+
+    def rerank(self, question, candidates, texts, top_k):
+        """
+        Re-order first-stage candidates by cross-encoder score
+        Args:
+            question (str): The user's question
+            candidates (list): (chunk index, similarity) pairs, best first
+            texts (list): Chunk texts indexed by chunk index
+            top_k (int): Number of hits to return
+        Returns:
+            list: Top k (chunk index, similarity) pairs; first-stage order
+                if scoring even a minimal batch would exceed the budget
+        """
+        size = len(candidates)
+        if self._seconds_per_pair:
+            # Only score as many pairs as the budget is expected to allow
+            size = min(size, int(self.budget / self._seconds_per_pair))
+        minimum = max(2, min(top_k, len(candidates)))
+        if size < minimum:
+            self._fallbacks_in_a_row += 1
+            if self._fallbacks_in_a_row < self.probe_every:
+                RERANK_FALLBACKS.inc(reason="budget")
+                return candidates[:top_k]
+            # Probe with the smallest useful batch and take its speed as the
+            # new estimate, so a pessimistic one (e.g. from a slow period)
+            # can recover
+            size = minimum
+            self._seconds_per_pair = None
+        self._fallbacks_in_a_row = 0
+
+        # Scored in the calling thread: there is no way to stop a batch once
+        # started, so a thread pool with a timeout would only queue requests
+        # behind a batch that keeps running
+        pairs = [(question, texts[idx]) for idx, _ in candidates[:size]]
+        start = time.perf_counter()
+        scores = self._score(pairs)
+        elapsed = time.perf_counter() - start
+        if elapsed > self.budget:
+            logger.warning(f"Re-ranking {size} pairs took {elapsed * 1000:.0f} ms, "
+                           f"over the {self.budget * 1000:.0f} ms budget")
+
+        order = np.argsort(-scores, kind='stable')
+        reranked = [candidates[i] for i in order] + candidates[size:]
+        return reranked[:top_k]
@@ -0,0 +1,184 @@
+import os
+import logging
+import itertools
+import threading
+import weakref
+import multiprocessing
+from concurrent.futures import Future
+
+import numpy as np
+# A scikit-learn dependency, so always installed alongside it
+from threadpoolctl import threadpool_limits
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TIMEOUT = float(os.environ.get("SHARD_SEARCH_TIMEOUT", 10.0))
+
+
+def _load_rows(source, start, end):
+    """Rows start:end of an embedding matrix given as an array or a .npy path"""
+    if isinstance(source, str):
+        # Map the file and copy only this shard's rows into memory
+        return np.array(np.load(source, mmap_mode='r')[start:end], dtype=np.float32)
+    return np.asarray(source, dtype=np.float32)
+
+
+def _serve_shard(shard_no, source, start, end, requests, results, threads):
+    """Worker process: answer top-k queries against one slice of the index"""
+    # numpy is already loaded by the time this runs (unpickling the arguments
+    # imports it), so BLAS thread counts must be set at runtime, not via env
+    threadpool_limits(limits=threads)
+    try:
+        rows = _load_rows(source, start, end)
+        # Normalised once so a dot product is the cosine similarity
+        rows /= np.clip(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12, None)
+    except Exception as e:
+        results.put(('error', shard_no, f"Failed to load shard: {str(e)}"))
+        return
+    results.put(('ready', shard_no, len(rows)))
+
+    while True:
+        message = requests.get()
+        if message is None:
+            return
+        request_id, query, limit, threshold, local = message
+        try:
+            subset = rows if local is None else rows[local]
+            similarities = subset @ query
+            if limit < len(similarities):
+                top = np.argpartition(-similarities, limit)[:limit]
+            else:
+                top = np.arange(len(similarities))
+            top = top[similarities[top] >= threshold]
+            indices = top if local is None else local[top]
+            results.put((request_id, shard_no, indices + start, similarities[top]))
+        except Exception as e:
+            results.put((request_id, shard_no, RuntimeError(f"Shard {shard_no}: {str(e)}"), None))
+
+
+def _collect_results(results, pending, lock):
+    """Coordinator thread: hand each shard's reply to the request waiting for it"""
+    while True:
+        message = results.get()
+        if message is None:
+            return
+        request_id, shard_no, indices, similarities = message
+        with lock:
+            entry = pending.get(request_id)
+        if entry is None:
+            continue  # the request already timed out
+        future, parts, expected = entry
+        if future.done():
+            continue
+        if isinstance(indices, Exception):
+            future.set_exception(indices)
+            continue
+        parts[shard_no] = (indices, similarities)
+        if len(parts) == expected:
+            future.set_result(parts)
+
+
+def _shutdown(request_queues, processes, results):
+    for requests in request_queues:
+        requests.put(None)
+    for process in processes:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+    results.put(None)
+
+
+class ShardedIndex:
+    """
+    Embedding index partitioned across local worker processes
+
+    Each worker holds one contiguous slice of the rows and returns its own
+    top hits; the coordinator merges them, so the rows held by any one
+    process shrink as workers are added.
+    """
+
+    def __init__(self, source, num_rows, num_shards, threads=1):
+        """
+        Start the workers and wait until each has loaded its slice
+        Args:
+            source: Embedding matrix, or path to a .npy file (which each
+                worker maps itself, so the rows are never all in one process)
+            num_rows (int): Rows in the matrix
+            num_shards (int): Worker processes
+            threads (int): Math threads per worker
+        """
+        bounds = np.linspace(0, num_rows, num_shards + 1).astype(int)
+        self.ranges = [(int(start), int(end)) for start, end in zip(bounds, bounds[1:])]
+
+        context = multiprocessing.get_context('spawn')
+        self._results = context.Queue()
+        self._requests = []
+        self._processes = []
+        for shard_no, (start, end) in enumerate(self.ranges):
+            requests = context.Queue()
+            shard_source = source if isinstance(source, str) else source[start:end]
+            process = context.Process(
+                target=_serve_shard,
+                args=(shard_no, shard_source, start, end, requests, self._results, threads),
+                daemon=True
+            )
+            process.start()
+            self._requests.append(requests)
+            self._processes.append(process)
+
+        for _ in self.ranges:
+            status, shard_no, detail = self._results.get(timeout=300)
+            if status == 'error':
+                _shutdown(self._requests, self._processes, self._results)
+                raise RuntimeError(f"Shard {shard_no}: {detail}")
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        threading.Thread(
+            target=_collect_results, args=(self._results, self._pending, self._lock), daemon=True
+        ).start()
+        # Stop the workers when the index is dropped, e.g. after a reload
+        self._finalizer = weakref.finalize(self, _shutdown, self._requests, self._processes, self._results)
+        logger.info(f"Started {num_shards} search shards over {num_rows} rows")
+
+    def search(self, query_embedding, limit, threshold, candidates=None):
+        """
+        Fan a query out to every shard and merge their top hits
+        Args:
+            query_embedding (numpy.ndarray): Query vector
+            limit (int): Hits to return
+            threshold (float): Minimum cosine similarity
+            candidates (numpy.ndarray): Sorted global row indices to restrict
+                the search to, or None for all rows
+        Returns:
+            list: (row index, similarity) pairs, best first
+        """
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        query = query / max(np.linalg.norm(query), 1e-12)
+
+        request_id = next(self._ids)
+        future = Future()
+        with self._lock:
+            self._pending[request_id] = (future, {}, len(self.ranges))
+        try:
+            for shard_no, (start, end) in enumerate(self.ranges):
+                local = None
+                if candidates is not None:
+                    lo, hi = np.searchsorted(candidates, [start, end])
+                    local = candidates[lo:hi] - start
+                self._requests[shard_no].put((request_id, query, limit, threshold, local))
+            parts = future.result(timeout=SEARCH_TIMEOUT)
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+        indices = np.concatenate([parts[shard_no][0] for shard_no in range(len(self.ranges))])
+        similarities = np.concatenate([parts[shard_no][1] for shard_no in range(len(self.ranges))])
+        # Best first; equal scores keep row order so results are deterministic
+        order = np.lexsort((indices, -similarities))[:limit]
+        return [(int(indices[i]), float(similarities[i])) for i in order]
+
+    def close(self):
+        """Stop the worker processes"""
+        self._finalizer()
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Dict, Hashable
+
+import metrics
+
+COALESCED_REQUESTS = metrics.counter(
+    "qa_coalesced_requests_total", "Requests that awaited an identical in-flight computation"
+)
+
+
+def normalize_question(question: str) -> str:
+    """Case- and whitespace-insensitive form of a question for deduplication"""
+    return " ".join(question.lower().split())
+
+
+class SingleFlight:
+    """Run at most one computation per key at a time; concurrent callers share it"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func, *args, **kwargs):
+        """
+        Await func(*args, **kwargs), or the identical call already running
+        Args:
+            key: Identity of the computation, e.g. normalized question and filters
+            func: Coroutine function to run
+        Returns:
+            The shared result; exceptions are shared too
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            # A task, not a bare await, so one caller disconnecting
+            # does not cancel the work the others are waiting on
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+            COALESCED_REQUESTS.inc()
+        return await asyncio.shield(task)
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> dict:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "inflight": self.inflight
+        }
@@ -9,6 +9,7 @@ from bs4 import BeautifulSoup
 import json
 import time
 import re
+from http_cache import CachedFetcher, docsify_source_url
 
 def scrape_tds_content():
     # Set up Chrome options
@@ -42,8 +43,23 @@ def scrape_tds_content():
             'content': main_content.text
         })
         
+        # Markdown sources are revalidated with conditional requests so
+        # unchanged pages are neither re-rendered nor re-parsed
+        fetcher = CachedFetcher()
+        
         # Visit each link
         for url in urls:
+            source = None
+            try:
+                source = fetcher.fetch(docsify_source_url(url))
+                cached_doc = fetcher.get_parsed(source)
+                if cached_doc:
+                    documents.append(cached_doc)
+                    print(f"Unchanged: {url}")
+                    continue
+            except Exception as e:
+                print(f"Could not revalidate {url}: {str(e)}")
+            
             try:
                 driver.get(url)
                 time.sleep(3)  # Wait for content to load
@@ -65,6 +81,8 @@ def scrape_tds_content():
                 }
                 
                 documents.append(doc)
+                if source:
+                    fetcher.put_parsed(source, doc)
                 print(f"Scraped: {url}")
                 
             except Exception as e:
@@ -75,7 +93,10 @@ def scrape_tds_content():
             for doc in documents:
                 f.write(json.dumps(doc) + '\n')
         
+        fetcher.save()
+        pruned = fetcher.prune()
         print(f"Successfully scraped {len(documents)} pages")
+        print(f"HTTP cache: {fetcher.report()}; pruned {pruned} stale bodies")
         
     finally:
         driver.quit()
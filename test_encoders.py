@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from encoders import (
+    MIN_PARITY_COSINE, MIN_QUANTIZED_PARITY_COSINE, ONNX_FILE, QUANTIZED_ONNX_FILE,
+    OnnxEncoder, SentenceTransformerEncoder, _parity_texts, check_parity
+)
+
+MODEL_DIR = os.environ.get("ONNX_MODEL_DIR", "onnx_model")
+
+pytestmark = pytest.mark.skipif(
+    not os.path.exists(os.path.join(MODEL_DIR, ONNX_FILE)),
+    reason=f"no exported model in {MODEL_DIR}"
+)
+
+
+@pytest.fixture(scope="module")
+def reference():
+    pytest.importorskip("sentence_transformers")
+    return SentenceTransformerEncoder()
+
+
+@pytest.fixture(scope="module")
+def texts():
+    return _parity_texts("tds_content.jsonl", 200)
+
+
+@pytest.mark.parametrize("quantized, model_file, min_cosine", [
+    (False, ONNX_FILE, MIN_PARITY_COSINE),
+    (True, QUANTIZED_ONNX_FILE, MIN_QUANTIZED_PARITY_COSINE),
+])
+def test_onnx_embeddings_match_pytorch(request, texts, quantized, model_file, min_cosine):
+    if not os.path.exists(os.path.join(MODEL_DIR, model_file)):
+        pytest.skip(f"no exported {model_file} in {MODEL_DIR}")
+    pytest.importorskip("onnxruntime")
+    # Loaded only once a model to compare against is known to exist
+    reference = request.getfixturevalue("reference")
+    cosines = check_parity(reference, OnnxEncoder(MODEL_DIR, quantized=quantized), texts)
+    assert len(cosines) == len(texts)
+    assert cosines.min() >= min_cosine
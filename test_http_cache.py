@@ -0,0 +1,79 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_cache import CachedFetcher
+
+PAGE = {
+    'body': b'# Docker\n\nRun containers for the project.\n',
+    'etag': '"v1"',
+    'last_modified': 'Mon, 06 Jan 2025 10:00:00 GMT'
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves PAGE with validators and answers 304 when they match"""
+
+    def do_GET(self):
+        if (self.headers.get('If-None-Match') == PAGE['etag']
+                or self.headers.get('If-Modified-Since') == PAGE['last_modified']):
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', PAGE['etag'])
+        self.send_header('Last-Modified', PAGE['last_modified'])
+        self.send_header('Content-Length', str(len(PAGE['body'])))
+        self.end_headers()
+        self.wfile.write(PAGE['body'])
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}/docker.md"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_revalidation_serves_cached_body_and_parsed_record(server, tmp_path):
+    first_run = CachedFetcher(str(tmp_path))
+    result = first_run.fetch(server)
+    assert result.status == 200 and result.changed
+    assert first_run.get_parsed(result) is None
+    first_run.put_parsed(result, {'title': 'Docker', 'content': 'parsed'})
+    first_run.save()
+
+    second_run = CachedFetcher(str(tmp_path))
+    result = second_run.fetch(server)
+    assert result.status == 304
+    assert not result.changed
+    assert result.body == PAGE['body']
+    assert second_run.stats['not_modified'] == 1
+    assert second_run.stats['bytes_saved'] == len(PAGE['body'])
+    assert second_run.stats['bytes_downloaded'] == 0
+    assert second_run.get_parsed(result) == {'title': 'Docker', 'content': 'parsed'}
+
+
+def test_changed_body_drops_parsed_record_and_prunes_old_body(server, tmp_path, monkeypatch):
+    fetcher = CachedFetcher(str(tmp_path))
+    old = fetcher.fetch(server)
+    fetcher.put_parsed(old, {'content': 'old'})
+
+    monkeypatch.setitem(PAGE, 'body', b'# Docker\n\nUpdated notes.\n')
+    monkeypatch.setitem(PAGE, 'etag', '"v2"')
+    monkeypatch.setitem(PAGE, 'last_modified', 'Tue, 07 Jan 2025 10:00:00 GMT')
+    new = fetcher.fetch(server)
+    assert new.status == 200 and new.changed
+    assert new.body == PAGE['body']
+    assert fetcher.get_parsed(new) is None
+
+    fetcher.save()
+    assert fetcher.prune() == 1
+    assert CachedFetcher(str(tmp_path)).fetch(server).body == PAGE['body']
@@ -0,0 +1,56 @@
+import os
+import asyncio
+import hashlib
+
+import pytest
+from PIL import Image
+
+import ocr
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'ocr_hello.png')
+
+pytestmark = pytest.mark.skipif(not ocr.is_available(), reason="tesseract is not installed")
+
+
+@pytest.fixture
+def image():
+    with open(FIXTURE, 'rb') as f:
+        data = f.read()
+    with Image.open(FIXTURE) as img:
+        img.load()
+        yield img, hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    ocr._cache.clear()
+    yield
+    ocr.shutdown()
+    ocr._cache.clear()
+
+
+def test_extract_text_reads_rendered_text(image):
+    img, digest = image
+    # Generous timeout: the first job also starts the worker process
+    text = asyncio.run(ocr.extract_text(img, digest, timeout=60))
+    assert 'HELLO DOCKER' in text.upper()
+
+
+def test_cached_text_is_served_without_waiting(image):
+    img, digest = image
+    text = asyncio.run(ocr.extract_text(img, digest, timeout=60))
+    assert ocr.get_cached(digest) == text
+    # A zero timeout would return "" if this went back to the pool
+    assert asyncio.run(ocr.extract_text(img, digest, timeout=0)) == text
+
+
+def test_slow_ocr_answers_without_text(image):
+    img, digest = image
+    assert asyncio.run(ocr.extract_text(img, digest, timeout=0.001)) == ""
+
+
+def test_full_queue_answers_without_text(image, monkeypatch):
+    img, digest = image
+    monkeypatch.setattr(ocr, 'OCR_MAX_PENDING', 0)
+    assert asyncio.run(ocr.extract_text(img, digest, timeout=60)) == ""
+    assert ocr.get_cached(digest) is None
@@ -0,0 +1,58 @@
+from page_parsers import parse_course_page, parse_links, parse_topic_list, parse_topic_page
+
+
+def test_course_page_keeps_code_blocks_verbatim():
+    html = """<html><head><title>Python basics</title></head><body>
+    <article class="content">
+      <h1>Functions</h1>
+      <p>Define a   function
+         with <code>def</code>:</p>
+      <pre><code>def f():
+    return 1
+
+print(f())
+</code></pre>
+      <p>Done.</p>
+    </article></body></html>"""
+    page = parse_course_page(html)
+    assert page['title'] == 'Python basics'
+    assert page['content'] == (
+        "Functions\n"
+        "Define a function with def:\n"
+        "def f():\n"
+        "    return 1\n"
+        "\n"
+        "print(f())\n"
+        "Done."
+    )
+
+
+def test_table_cells_are_separated():
+    html = """<div class="content"><table>
+      <tr><th>Week</th><th>Topic</th></tr>
+      <tr><td>1</td><td>Docker</td></tr>
+    </table></div>"""
+    assert parse_course_page(html)['content'] == "Week Topic\n1 Docker"
+
+
+def test_breaks_and_hidden_elements():
+    html = '<div class="content">first<br>second<script>var x = 1;</script><!-- note --></div>'
+    assert parse_course_page(html)['content'] == "first\nsecond"
+
+
+def test_links_and_forum_pages():
+    html = """<aside class="sidebar"><a href="#/docker">Docker</a><a href="https://x.org/a">A</a></aside>"""
+    assert parse_links(html, 'https://tds.example/', 'sidebar') == [
+        'https://tds.example/#/docker', 'https://x.org/a'
+    ]
+
+    topics = """<table><tr class="topic-list-item">
+      <td class="title"><a href="/t/help/1">Help</a></td>
+      <td class="last-posting-date">Jan 5</td></tr></table>"""
+    assert parse_topic_list(topics, 'https://forum.example/c/tds') == [
+        ('https://forum.example/t/help/1', 'Jan 5')
+    ]
+
+    topic = """<title>Help</title>
+      <div class="topic-post"><div class="post-content"><p>How do I run</p><pre>docker  ps</pre></div></div>"""
+    assert parse_topic_page(topic) == {'title': 'Help', 'posts': ['How do I run\ndocker  ps']}
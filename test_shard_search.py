@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from shard_search import ShardedIndex
+
+ROWS, DIMS, SHARDS = 500, 16, 3
+
+
+@pytest.fixture(scope="module")
+def matrix():
+    return np.random.default_rng(7).standard_normal((ROWS, DIMS)).astype(np.float32)
+
+
+@pytest.fixture(scope="module", params=["array", "npy"])
+def index(request, matrix, tmp_path_factory):
+    # Workers either get their slice pickled or map the .npy file themselves
+    source = matrix
+    if request.param == "npy":
+        source = str(tmp_path_factory.mktemp("index") / "embeddings.npy")
+        np.save(source, matrix)
+    sharded = ShardedIndex(source, ROWS, SHARDS)
+    yield sharded
+    sharded.close()
+
+
+def brute_force(matrix, query, limit, threshold, candidates=None):
+    """Top hits by cosine similarity over every row, or only the candidates"""
+    normalized = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    similarities = normalized @ (query / np.linalg.norm(query))
+    rows = np.arange(len(matrix)) if candidates is None else candidates
+    rows = rows[similarities[rows] >= threshold]
+    order = np.lexsort((rows, -similarities[rows]))[:limit]
+    return [int(row) for row in rows[order]], similarities[rows[order]]
+
+
+@pytest.mark.parametrize("limit, threshold", [(1, -1.0), (10, -1.0), (10, 0.3), (ROWS + 5, -1.0)])
+def test_top_k_matches_brute_force(index, matrix, limit, threshold):
+    rng = np.random.default_rng(limit)
+    for _ in range(5):
+        query = rng.standard_normal(DIMS).astype(np.float32)
+        hits = index.search(query, limit, threshold)
+        expected_rows, expected_scores = brute_force(matrix, query, limit, threshold)
+        assert [row for row, _ in hits] == expected_rows
+        np.testing.assert_allclose([score for _, score in hits], expected_scores, atol=1e-5)
+
+
+@pytest.mark.parametrize("keep", [0.05, 0.6])
+def test_candidates_restrict_search(index, matrix, keep):
+    rng = np.random.default_rng(int(keep * 100))
+    # Sorted global row indices spanning shard boundaries
+    candidates = np.flatnonzero(rng.random(ROWS) < keep)
+    for _ in range(5):
+        query = rng.standard_normal(DIMS).astype(np.float32)
+        hits = index.search(query, 10, -1.0, candidates)
+        expected_rows, expected_scores = brute_force(matrix, query, 10, -1.0, candidates)
+        assert [row for row, _ in hits] == expected_rows
+        assert set(expected_rows) <= set(candidates.tolist())
+        np.testing.assert_allclose([score for _, score in hits], expected_scores, atol=1e-5)
+
+
+def test_empty_candidates_return_nothing(index):
+    query = np.ones(DIMS, dtype=np.float32)
+    assert index.search(query, 10, -1.0, np.array([], dtype=np.int64)) == []